@@ -174,11 +174,11 @@ from prompts import (
 
 # === RAG Cache Support ===
 try:
-    from utils.gemini_rag import get_cache_name
+    from utils.gemini_rag import aget_cache_name
     RAG_ENABLED = True
 except ImportError:
     RAG_ENABLED = False
-    def get_cache_name(workshop_id):
+    async def aget_cache_name(workshop_id):
         return None
 
 # === File Search Store (Gemini RAG) ===
@@ -1945,8 +1945,9 @@ async def on_feedback(feedback):
             if message_content and user_message:
                 break
 
-        # Store feedback
-        store_feedback(
+        # Store feedback (Supabase upload runs off the event loop)
+        await asyncio.to_thread(
+            store_feedback,
             message_id=feedback.id,
             thread_id=thread_id,
             score=feedback.value,  # 1 = thumbs up, 0 = thumbs down
@@ -2053,7 +2054,8 @@ async def on_rate_detailed(action: cl.Action):
             break
 
     # Store detailed feedback
-    store_feedback(
+    await asyncio.to_thread(
+        store_feedback,
         message_id=message_id,
         thread_id=thread_id,
         score=score,
@@ -4767,7 +4769,8 @@ async def main(message: cl.Message):
         bot_id = cl.user_session.get("chat_profile", "lawrence")
 
         # Store the comment with the previous feedback
-        store_feedback(
+        await asyncio.to_thread(
+            store_feedback,
             message_id=feedback_context.get("message_id", "unknown"),
             thread_id=thread_id,
             score=feedback_context.get("score", 3),
@@ -4836,19 +4839,22 @@ Your insights help us improve Mindrian!"""
         async with cl.Step(name="Generating Image", type="tool") as step:
             step.input = f"Detected image request: {image_prompt}"
 
+            # A repeated identical request may reuse a recent image; Regenerate never does
             image_bytes, mime_type, metadata = await generate_image(
                 prompt=image_prompt,
                 model="fast",
-                aspect_ratio="square"
+                aspect_ratio="square",
+                use_cache=True
             )
 
             if image_bytes:
                 step.output = f"Image generated ({metadata.get('size_bytes', 0):,} bytes)"
                 temp_path = save_image_to_temp(image_bytes, mime_type)
 
-                # Track usage
-                context_key = get_context_key()
-                track_image_generation(context_key)
+                # Track usage (cache hits didn't call the API)
+                if not metadata.get("cached"):
+                    context_key = get_context_key()
+                    track_image_generation(context_key)
 
                 await cl.Message(
                     content=f"**Generated Image**\n\n*Prompt:* {image_prompt}",
@@ -5136,7 +5142,7 @@ Your insights help us improve Mindrian!"""
     try:
         # Check for cached context (RAG) for this bot
         bot_id = cl.user_session.get("bot_id", "lawrence")
-        cache_name = get_cache_name(bot_id) if RAG_ENABLED else None
+        cache_name = await aget_cache_name(bot_id) if RAG_ENABLED else None
 
         # Build system instruction with context handoff if applicable
         system_instruction = bot["system_prompt"]
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Prefetch Framework Diagrams
+===========================
+Downloads every image in utils.media.FRAMEWORK_IMAGES into public/frameworks/
+so get_framework_image serves them from Chainlit's /public mount instead of
+hotlinking third-party hosts. Run at build time:
+
+    python scripts/prefetch_frameworks.py
+
+Existing files are revalidated with If-Modified-Since and only rewritten when
+the remote copy changed.
+"""
+
+import os
+import sys
+import tempfile
+from email.utils import formatdate
+
+# Add parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from utils.media import FRAMEWORK_IMAGES, FRAMEWORK_STATIC_DIR, framework_static_filename
+
+
+def prefetch(client: httpx.Client, key: str, url: str) -> str:
+    """Download one diagram if missing or changed. Returns a short status string."""
+    dest = FRAMEWORK_STATIC_DIR / framework_static_filename(key)
+
+    headers = {"User-Agent": "Mindrian/1.0"}
+    if dest.exists():
+        headers["If-Modified-Since"] = formatdate(dest.stat().st_mtime, usegmt=True)
+
+    response = client.get(url, headers=headers)
+    if response.status_code == 304:
+        return "up to date"
+    response.raise_for_status()
+
+    # Write atomically so a running app never serves a partial image
+    with tempfile.NamedTemporaryFile(dir=FRAMEWORK_STATIC_DIR, delete=False) as f:
+        f.write(response.content)
+    os.replace(f.name, dest)
+    return f"downloaded ({len(response.content):,} bytes)"
+
+
+def main() -> int:
+    FRAMEWORK_STATIC_DIR.mkdir(parents=True, exist_ok=True)
+    failures = 0
+
+    with httpx.Client(timeout=15.0, follow_redirects=True) as client:
+        for key, url in FRAMEWORK_IMAGES.items():
+            try:
+                status = prefetch(client, key, url)
+                print(f"  ✅ {key}: {status}")
+            except Exception as e:
+                failures += 1
+                print(f"  ❌ {key}: {e}")
+
+    # Missing diagrams still work at runtime via the remote URL fallback
+    if failures:
+        print(f"\n{failures} diagram(s) not fetched; they will be served from their source URLs")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,15 +5,29 @@ Stores user feedback (thumbs up/down, detailed ratings, comments) in Supabase fo
 
 import os
 import json
-from datetime import datetime
+import time
+import heapq
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 
+import msgpack
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "mindrian-files")
 
-# In-memory cache for recent feedback (for session analytics)
-_feedback_cache: Dict[str, Dict] = {}
+# In-memory cache for recent feedback (for session analytics).
+# Bounded LRU with TTL so long-running servers don't grow it forever;
+# Supabase remains the authoritative store.
+FEEDBACK_CACHE_MAX_SIZE = 10_000
+FEEDBACK_CACHE_TTL = 7 * 24 * 3600  # 7 days, the default dashboard window
+_feedback_cache: "OrderedDict[str, Dict]" = OrderedDict()
+_feedback_cache_times: Dict[str, float] = {}
+# store_feedback may run in worker threads, so guard cache mutation and snapshots
+_feedback_cache_lock = threading.Lock()
 
 # Initialize Supabase client
 _supabase_client = None
@@ -27,6 +41,13 @@ RATING_SCALE = {
     5: {"emoji": "🤩", "label": "Excellent", "description": "Exactly what I needed!"},
 }
 
+# Precomputed for the feedback hot path
+_RATING_BY_SCORE = {score: (info["emoji"], info["label"]) for score, info in RATING_SCALE.items()}
+_RATING_SCALE_DISPLAY = "\n".join(
+    ["**Rate this response:**\n"]
+    + [f"{emoji} **{score}** - {label}" for score, (emoji, label) in _RATING_BY_SCORE.items()]
+)
+
 # Quick feedback categories for detailed insights
 FEEDBACK_CATEGORIES = {
     "accuracy": "Was the information accurate?",
@@ -52,6 +73,34 @@ def get_supabase_client():
     return _supabase_client
 
 
+def _evict_expired(now: float) -> None:
+    """Drop expired and over-capacity entries. Caller must hold _feedback_cache_lock."""
+    # Oldest entries sit at the front, so stop at the first one worth keeping
+    while _feedback_cache:
+        oldest = next(iter(_feedback_cache))
+        if len(_feedback_cache) <= FEEDBACK_CACHE_MAX_SIZE and now - _feedback_cache_times[oldest] < FEEDBACK_CACHE_TTL:
+            break
+        del _feedback_cache[oldest]
+        del _feedback_cache_times[oldest]
+
+
+def _cache_feedback(message_id: str, feedback_data: Dict) -> None:
+    """Add feedback to the in-memory cache, evicting expired and least-recent entries."""
+    now = time.monotonic()
+    with _feedback_cache_lock:
+        _feedback_cache[message_id] = feedback_data
+        _feedback_cache.move_to_end(message_id)
+        _feedback_cache_times[message_id] = now
+        _evict_expired(now)
+
+
+def _cached_feedback() -> List[Dict]:
+    """Snapshot of the unexpired entries in the in-memory feedback cache."""
+    with _feedback_cache_lock:
+        _evict_expired(time.monotonic())
+        return list(_feedback_cache.values())
+
+
 def store_feedback(
     message_id: str,
     thread_id: str,
@@ -83,14 +132,14 @@ def store_feedback(
         True if stored successfully
     """
     # Determine rating label based on feedback type
-    if feedback_type == "detailed" and score in RATING_SCALE:
-        rating_info = RATING_SCALE[score]
-        rating_label = rating_info["label"]
-        rating_emoji = rating_info["emoji"]
+    rating = _RATING_BY_SCORE.get(score) if feedback_type == "detailed" else None
+    if rating:
+        rating_emoji, rating_label = rating
     else:
         rating_label = "positive" if score >= 1 else "negative"
         rating_emoji = "👍" if score >= 1 else "👎"
 
+    now = datetime.now(timezone.utc)
     feedback_data = {
         "message_id": message_id,
         "thread_id": thread_id,
@@ -104,12 +153,12 @@ def store_feedback(
         "phase": phase,
         "message_preview": (message_content[:500] + "...") if message_content and len(message_content) > 500 else message_content,
         "user_message_preview": (user_message[:200] + "...") if user_message and len(user_message) > 200 else user_message,
-        "timestamp": datetime.utcnow().isoformat(),
-        "date": datetime.utcnow().strftime("%Y-%m-%d"),
+        "timestamp": now.isoformat(),
+        "date": f"{now.year:04d}-{now.month:02d}-{now.day:02d}",
     }
 
     # Cache in memory
-    _feedback_cache[message_id] = feedback_data
+    _cache_feedback(message_id, feedback_data)
 
     # Store in Supabase
     return _save_to_supabase(feedback_data)
@@ -131,9 +180,10 @@ def get_feedback_confirmation_message(
     Returns:
         Formatted confirmation message
     """
-    if feedback_type == "detailed" and score in RATING_SCALE:
-        info = RATING_SCALE[score]
-        msg = f"**{info['emoji']} Feedback Received: {info['label']}**"
+    rating = _RATING_BY_SCORE.get(score) if feedback_type == "detailed" else None
+    if rating:
+        emoji, label = rating
+        msg = f"**{emoji} Feedback Received: {label}**"
     else:
         emoji = "👍" if score >= 1 else "👎"
         label = "Positive" if score >= 1 else "Negative"
@@ -148,49 +198,86 @@ def get_feedback_confirmation_message(
 
 def get_rating_scale_display() -> str:
     """Get a formatted display of the rating scale for UI."""
-    lines = ["**Rate this response:**\n"]
-    for score, info in RATING_SCALE.items():
-        lines.append(f"{info['emoji']} **{score}** - {info['label']}")
-    return "\n".join(lines)
+    return _RATING_SCALE_DISPLAY
+
+
+# Max objects requested per Storage list() call
+_LIST_PAGE_SIZE = 1000
+
+# Per-message record formats: current msgpack, legacy JSON
+_RECORD_SUFFIXES = (".msgpack", ".json")
+
+
+def _feedback_record_path(date_str: str, message_id: str) -> str:
+    """Storage path of one message's feedback record."""
+    return f"feedback/{date_str}/{message_id}.msgpack"
+
+
+def _list_names(bucket, folder: str) -> List[str]:
+    """Names of all objects in a Storage folder, paging past the list() limit."""
+    names = []
+    offset = 0
+    while True:
+        page = bucket.list(folder, {"limit": _LIST_PAGE_SIZE, "offset": offset})
+        names.extend(file_info.get("name", "") for file_info in page)
+        if len(page) < _LIST_PAGE_SIZE:
+            return names
+        offset += _LIST_PAGE_SIZE
+
+
+def _decode_record(name: str, content: bytes) -> Optional[Dict]:
+    """Decode one per-message feedback record by its file extension."""
+    if name.endswith(".msgpack"):
+        return msgpack.unpackb(content, raw=False)
+    if name.endswith(".json"):
+        return json.loads(content.decode('utf-8'))
+    return None
+
+
+def _load_day(client, date_str: str) -> List[Dict]:
+    """
+    Load all feedback for one day.
+
+    Reads the per-message records in feedback/<date>/. Records are applied in
+    listing (name) order, so a message's .msgpack record supersedes its legacy
+    .json one.
+    """
+    latest: Dict[Any, Dict] = {}
+    bucket = client.storage.from_(SUPABASE_BUCKET)
+    folder = f"feedback/{date_str}"
+    # Storage 'search' only matches name prefixes, so filter by extension here
+    for name in _list_names(bucket, folder):
+        if name.endswith(_RECORD_SUFFIXES):
+            content = bucket.download(f"{folder}/{name}")
+            record = _decode_record(name, content) if content else None
+            if record:
+                latest[record.get("message_id")] = record
+    return list(latest.values())
 
 
 def _save_to_supabase(feedback_data: Dict) -> bool:
-    """Save feedback to Supabase Storage as JSON."""
+    """Save feedback to Supabase Storage as one msgpack record per message."""
     client = get_supabase_client()
     if not client:
         print("Feedback stored in memory only (Supabase not configured)")
         return False
 
-    try:
-        # Create a unique filename based on date and message ID
-        date_str = feedback_data.get("date", datetime.utcnow().strftime("%Y-%m-%d"))
-        message_id = feedback_data.get("message_id", "unknown")
-        filename = f"feedback/{date_str}/{message_id}.json"
+    date_str = feedback_data.get("date") or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    message_id = feedback_data.get("message_id", "unknown")
+    filename = _feedback_record_path(date_str, message_id)
 
-        # Upload to Supabase Storage
-        json_content = json.dumps(feedback_data, indent=2).encode('utf-8')
+    try:
+        # Each message owns its object, so concurrent writers (other workers or
+        # instances) never touch each other's records; a re-rating upserts its own.
         client.storage.from_(SUPABASE_BUCKET).upload(
             path=filename,
-            file=json_content,
-            file_options={"content-type": "application/json"}
+            file=msgpack.packb(feedback_data, use_bin_type=True),
+            file_options={"content-type": "application/msgpack", "upsert": "true"}
         )
         print(f"Feedback saved: {filename}")
         return True
 
     except Exception as e:
-        # If file exists, try to update (upsert)
-        if "Duplicate" in str(e) or "already exists" in str(e).lower():
-            try:
-                client.storage.from_(SUPABASE_BUCKET).update(
-                    path=filename,
-                    file=json_content,
-                    file_options={"content-type": "application/json"}
-                )
-                print(f"Feedback updated: {filename}")
-                return True
-            except Exception as update_err:
-                print(f"Feedback update error: {update_err}")
-                return False
         print(f"Feedback storage error: {e}")
         return False
 
@@ -212,21 +299,18 @@ def get_feedback_stats(
     client = get_supabase_client()
 
     # Start with in-memory cache
-    all_feedback = list(_feedback_cache.values())
+    all_feedback = _cached_feedback()
 
     # Add from Supabase if available
     if client:
         try:
-            folder = f"feedback/{date}" if date else "feedback"
-            files = client.storage.from_(SUPABASE_BUCKET).list(folder)
-
-            for file_info in files:
-                if file_info.get("name", "").endswith(".json"):
-                    path = f"{folder}/{file_info['name']}"
-                    content = client.storage.from_(SUPABASE_BUCKET).download(path)
-                    if content:
-                        feedback = json.loads(content.decode('utf-8'))
-                        all_feedback.append(feedback)
+            if date:
+                all_feedback.extend(_load_day(client, date))
+            else:
+                # Each day is a feedback/<date>/ folder
+                names = _list_names(client.storage.from_(SUPABASE_BUCKET), "feedback")
+                for day in sorted(name for name in names if name and "." not in name):
+                    all_feedback.extend(_load_day(client, day))
         except Exception as e:
             print(f"Error fetching feedback from Supabase: {e}")
 
@@ -234,23 +318,28 @@ def get_feedback_stats(
     if bot_id:
         all_feedback = [f for f in all_feedback if f.get("bot_id") == bot_id]
 
-    # Calculate statistics
+    # Calculate statistics and bot breakdown in a single pass
     total = len(all_feedback)
-    positive = sum(1 for f in all_feedback if f.get("score") == 1)
-    negative = total - positive
-    with_comments = sum(1 for f in all_feedback if f.get("comment"))
-
-    # Bot breakdown
+    positive = 0
+    with_comments = 0
     bot_stats = {}
+    recent_negative = deque(maxlen=5)  # Last 5 negative feedback for review
     for f in all_feedback:
+        score = f.get("score")
         bot = f.get("bot_id", "unknown")
         if bot not in bot_stats:
             bot_stats[bot] = {"positive": 0, "negative": 0, "total": 0}
         bot_stats[bot]["total"] += 1
-        if f.get("score") == 1:
+        if score == 1:
+            positive += 1
             bot_stats[bot]["positive"] += 1
         else:
             bot_stats[bot]["negative"] += 1
+            if score == 0:
+                recent_negative.append(f)
+        if f.get("comment"):
+            with_comments += 1
+    negative = total - positive
 
     return {
         "total_feedback": total,
@@ -259,17 +348,19 @@ def get_feedback_stats(
         "positive_rate": (positive / total * 100) if total > 0 else 0,
         "with_comments": with_comments,
         "by_bot": bot_stats,
-        "recent_negative": [
-            f for f in all_feedback
-            if f.get("score") == 0
-        ][-5:],  # Last 5 negative feedback for review
+        "recent_negative": list(recent_negative),
     }
 
 
 def get_session_feedback(thread_id: str) -> List[Dict]:
-    """Get all feedback for a specific session/thread."""
+    """
+    Get recent feedback for a specific session/thread.
+
+    Reads the bounded in-memory cache, so very old or evicted feedback is
+    not included (Supabase is authoritative).
+    """
     return [
-        f for f in _feedback_cache.values()
+        f for f in _cached_feedback()
         if f.get("thread_id") == thread_id
     ]
 
@@ -286,7 +377,7 @@ def export_feedback_report(date: Optional[str] = None) -> str:
     """
     stats = get_feedback_stats(date=date)
 
-    report = f"""# Mindrian Feedback Report
+    parts = [f"""# Mindrian Feedback Report
 **Date:** {date or "All Time"}
 **Generated:** {datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")}
 
@@ -308,26 +399,26 @@ def export_feedback_report(date: Optional[str] = None) -> str:
 
 | Bot | 👍 | 👎 | Total | Rate |
 |-----|----|----|-------|------|
-"""
+"""]
 
     for bot, data in stats.get("by_bot", {}).items():
         rate = (data['positive'] / data['total'] * 100) if data['total'] > 0 else 0
-        report += f"| {bot} | {data['positive']} | {data['negative']} | {data['total']} | {rate:.1f}% |\n"
+        parts.append(f"| {bot} | {data['positive']} | {data['negative']} | {data['total']} | {rate:.1f}% |\n")
 
     # Add recent negative feedback for review
     if stats.get("recent_negative"):
-        report += "\n---\n\n## Recent Negative Feedback (for review)\n\n"
+        parts.append("\n---\n\n## Recent Negative Feedback (for review)\n\n")
         for f in stats["recent_negative"]:
-            report += f"""
+            parts.append(f"""
 ### Message ID: {f.get('message_id', 'N/A')[:8]}...
 - **Bot:** {f.get('bot_id', 'unknown')}
 - **Phase:** {f.get('phase', 'N/A')}
 - **User Question:** {f.get('user_message_preview', 'N/A')}
 - **Comment:** {f.get('comment', 'No comment')}
 - **Time:** {f.get('timestamp', 'N/A')}
-"""
+""")
 
-    return report
+    return "".join(parts)
 
 
 def is_feedback_configured() -> bool:
@@ -337,6 +428,46 @@ def is_feedback_configured() -> bool:
 
 # === Enhanced Analytics Dashboard ===
 
+# Max concurrent Supabase Storage requests while building the dashboard
+_DASHBOARD_FETCH_CONCURRENCY = 16
+
+
+async def _download_feedback(bucket, path: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
+    """Download and decode a single per-message feedback record, or None on failure."""
+    try:
+        async with semaphore:
+            content = await asyncio.to_thread(bucket.download, path)
+        if content:
+            return _decode_record(path, content)
+    except Exception:
+        pass
+    return None
+
+
+async def _fetch_feedback_day(client, date_str: str, semaphore: asyncio.Semaphore) -> List[Dict]:
+    """
+    Fetch all feedback records stored for one day.
+
+    Same merge as _load_day, with the per-message records downloaded concurrently.
+    """
+    bucket = client.storage.from_(SUPABASE_BUCKET)
+    folder = f"feedback/{date_str}"
+    try:
+        async with semaphore:
+            names = await asyncio.to_thread(_list_names, bucket, folder)
+    except Exception:
+        return []
+
+    # Storage 'search' only matches name prefixes, so filter by extension here
+    paths = [f"{folder}/{name}" for name in names if name.endswith(_RECORD_SUFFIXES)]
+    # gather keeps listing order, so newer-format records still win
+    results = await asyncio.gather(
+        *[_download_feedback(bucket, path, semaphore) for path in paths]
+    )
+    latest = {r.get("message_id"): r for r in results if r}
+    return list(latest.values())
+
+
 async def get_feedback_dashboard(
     days: int = 7,
     bot_id: Optional[str] = None
@@ -354,52 +485,36 @@ async def get_feedback_dashboard(
     from datetime import timedelta
 
     client = get_supabase_client()
-    all_feedback = []
+    # Keyed by message_id so later entries overwrite earlier ones (cache wins over stored)
+    merged: Dict[str, Dict] = {}
 
-    # Collect feedback from Supabase for the date range
+    # Collect feedback from Supabase for the date range (all days in parallel)
     if client:
         end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-
-        # Iterate through date folders
-        current = start_date
-        while current <= end_date:
-            date_str = current.strftime("%Y-%m-%d")
-            try:
-                folder = f"feedback/{date_str}"
-                files = client.storage.from_(SUPABASE_BUCKET).list(folder)
-
-                for file_info in files:
-                    if file_info.get("name", "").endswith(".json"):
-                        path = f"{folder}/{file_info['name']}"
-                        try:
-                            content = client.storage.from_(SUPABASE_BUCKET).download(path)
-                            if content:
-                                feedback = json.loads(content.decode('utf-8'))
-                                all_feedback.append(feedback)
-                        except Exception:
-                            continue
-            except Exception:
-                pass
-            current += timedelta(days=1)
-
-    # Add in-memory cache
-    all_feedback.extend(_feedback_cache.values())
+        date_strs = [
+            (end_date - timedelta(days=offset)).strftime("%Y-%m-%d")
+            for offset in range(days, -1, -1)
+        ]
+        semaphore = asyncio.Semaphore(_DASHBOARD_FETCH_CONCURRENCY)
+        day_results = await asyncio.gather(
+            *[_fetch_feedback_day(client, date_str, semaphore) for date_str in date_strs]
+        )
+        for day_feedback in day_results:
+            for feedback in day_feedback:
+                msg_id = feedback.get("message_id")
+                if msg_id:
+                    merged[msg_id] = feedback
+
+    # Overlay in-memory cache (newer than what's stored)
+    merged.update(
+        (f["message_id"], f) for f in _cached_feedback() if f.get("message_id")
+    )
+    all_feedback = list(merged.values())
 
     # Filter by bot if specified
     if bot_id:
         all_feedback = [f for f in all_feedback if f.get("bot_id") == bot_id]
 
-    # Remove duplicates by message_id
-    seen = set()
-    unique_feedback = []
-    for f in all_feedback:
-        msg_id = f.get("message_id")
-        if msg_id and msg_id not in seen:
-            seen.add(msg_id)
-            unique_feedback.append(f)
-    all_feedback = unique_feedback
-
     # Calculate comprehensive stats
     total = len(all_feedback)
     if total == 0:
@@ -463,12 +578,12 @@ async def get_feedback_dashboard(
             (bot_stats[bot]["positive"] / total_bot * 100) if total_bot > 0 else 0
         )
 
-    # Recent feedback (last 10)
-    sorted_feedback = sorted(
+    # Recent feedback (last 10); nlargest decorates each item with its key once
+    sorted_feedback = heapq.nlargest(
+        10,
         all_feedback,
-        key=lambda x: x.get("timestamp", ""),
-        reverse=True
-    )[:10]
+        key=lambda x: x.get("timestamp", "")
+    )
 
     # Trend analysis (compare first half vs second half of period)
     mid_point = len(all_feedback) // 2
@@ -513,7 +628,7 @@ def format_dashboard_message(dashboard: Dict[str, Any]) -> str:
         return f"**Feedback Dashboard** ({dashboard.get('period_days', 7)} days)\n\nNo feedback data found for this period."
 
     # Header
-    msg = f"""**Feedback Analytics Dashboard**
+    parts = [f"""**Feedback Analytics Dashboard**
 *Period: Last {dashboard['period_days']} days | Generated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M')} UTC*
 
 ---
@@ -535,30 +650,30 @@ def format_dashboard_message(dashboard: Dict[str, Any]) -> str:
 
 | Bot | Total | Rate | Trend |
 |-----|-------|---------|-------|
-"""
+"""]
 
     # Bot stats
     for bot, stats in dashboard.get("by_bot", {}).items():
         emoji = "🟢" if stats["satisfaction_rate"] >= 80 else "🟡" if stats["satisfaction_rate"] >= 60 else "🔴"
-        msg += f"| {bot} | {stats['total']} | {stats['satisfaction_rate']:.1f}% | {emoji} |\n"
+        parts.append(f"| {bot} | {stats['total']} | {stats['satisfaction_rate']:.1f}% | {emoji} |\n")
 
     # Daily breakdown (last 5 days)
-    msg += "\n---\n\n## Daily Trend (Recent)\n\n| Date | Total | Rate |\n|------|-------|------|\n"
+    parts.append("\n---\n\n## Daily Trend (Recent)\n\n| Date | Total | Rate |\n|------|-------|------|\n")
     daily = dashboard.get("daily_breakdown", {})
     for date in sorted(daily.keys(), reverse=True)[:5]:
         stats = daily[date]
         rate = (stats["positive"] / stats["total"] * 100) if stats["total"] > 0 else 0
-        msg += f"| {date} | {stats['total']} | {rate:.0f}% |\n"
+        parts.append(f"| {date} | {stats['total']} | {rate:.0f}% |\n")
 
     # Recent negative feedback for review
     negative_feedback = [f for f in dashboard.get("recent_feedback", []) if f.get("score", 0) == 0]
     if negative_feedback:
-        msg += "\n---\n\n## Recent Negative Feedback (Action Items)\n\n"
+        parts.append("\n---\n\n## Recent Negative Feedback (Action Items)\n\n")
         for i, f in enumerate(negative_feedback[:3], 1):
-            msg += f"**{i}. {f.get('bot_id', 'unknown')}** - {f.get('timestamp', 'N/A')[:10]}\n"
-            msg += f"   - Question: *{f.get('user_message_preview', 'N/A')[:100]}*\n"
+            parts.append(f"**{i}. {f.get('bot_id', 'unknown')}** - {f.get('timestamp', 'N/A')[:10]}\n")
+            parts.append(f"   - Question: *{f.get('user_message_preview', 'N/A')[:100]}*\n")
             if f.get("comment"):
-                msg += f"   - Comment: \"{f['comment'][:150]}\"\n"
-            msg += "\n"
+                parts.append(f"   - Comment: \"{f['comment'][:150]}\"\n")
+            parts.append("\n")
 
-    return msg
+    return "".join(parts)
@@ -4,11 +4,23 @@ Handles PDF, DOCX, text file extraction, and image detection
 """
 
 import os
+import zipfile
 from typing import Optional, Tuple
-from pathlib import Path
+from xml.etree import ElementTree
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+# WordprocessingML tags read when streaming a DOCX body
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P, _W_T, _W_TAB, _W_BR, _W_CR = _W + "p", _W + "t", _W + "tab", _W + "br", _W + "cr"
+_W_PPR, _W_TBL, _W_TR, _W_TC = _W + "pPr", _W + "tbl", _W + "tr", _W + "tc"
 
 # === Image Support Constants ===
-IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif'}
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif'})
 IMAGE_MIME_TYPES = {
     '.jpg': 'image/jpeg',
     '.jpeg': 'image/jpeg',
@@ -19,15 +31,52 @@ IMAGE_MIME_TYPES = {
     '.heif': 'image/heif',
 }
 
+# Max characters of extracted text kept for conversation context
+MAX_EXTRACTED_CHARS = 50000
+TRUNCATION_NOTICE = "\n\n[... content truncated ...]"
+
+
+class _BoundedText:
+    """Collects text chunks (joined by blank lines) up to MAX_EXTRACTED_CHARS."""
+
+    def __init__(self, limit: int = MAX_EXTRACTED_CHARS):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+
+    @property
+    def full(self) -> bool:
+        return self.size > self.limit
+
+    def add(self, chunk: str) -> bool:
+        """Add a chunk. Returns False once the cap is exceeded so callers can stop extracting."""
+        if self.parts:
+            self.size += 2  # "\n\n" separator
+        self.parts.append(chunk)
+        self.size += len(chunk)
+        return not self.full
+
+    def getvalue(self) -> str:
+        text = "\n\n".join(self.parts)
+        if self.full:
+            return text[:self.limit] + TRUNCATION_NOTICE
+        return text
+
+
+def _ext(file_name: str) -> str:
+    """Lowercased file extension (like Path.suffix, without building a Path)."""
+    i = file_name.rfind('.')
+    return file_name[i:].lower() if i > 0 else ''
+
 
 def is_image_file(file_name: str) -> bool:
     """Check if file is a supported image type."""
-    return Path(file_name).suffix.lower() in IMAGE_EXTENSIONS
+    return _ext(file_name) in IMAGE_EXTENSIONS
 
 
 def get_image_mime_type(file_name: str) -> str:
     """Get MIME type for image file."""
-    return IMAGE_MIME_TYPES.get(Path(file_name).suffix.lower(), 'image/jpeg')
+    return IMAGE_MIME_TYPES.get(_ext(file_name), 'image/jpeg')
 
 
 def extract_text_from_pdf(file_path: str, max_pages: int = 50) -> Tuple[str, dict]:
@@ -41,33 +90,41 @@ def extract_text_from_pdf(file_path: str, max_pages: int = 50) -> Tuple[str, dic
     Returns:
         Tuple of (extracted_text, metadata_dict)
     """
-    try:
-        from PyPDF2 import PdfReader
-
-        reader = PdfReader(file_path)
-        num_pages = len(reader.pages)
-
-        text_parts = []
-        pages_extracted = min(num_pages, max_pages)
+    if not PDFIUM_AVAILABLE:
+        return "Error extracting PDF: pypdfium2 not installed", {"type": "pdf", "error": "pypdfium2 not installed"}
 
-        for i in range(pages_extracted):
-            page = reader.pages[i]
-            page_text = page.extract_text()
-            if page_text:
-                text_parts.append(f"--- Page {i+1} ---\n{page_text}")
-
-        full_text = "\n\n".join(text_parts)
-
-        # Truncate if too long (keep ~50k chars for context)
-        if len(full_text) > 50000:
-            full_text = full_text[:50000] + "\n\n[... content truncated ...]"
+    try:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            num_pages = len(pdf)
+
+            buffer = _BoundedText()
+            pages_extracted = 0
+
+            for i in range(min(num_pages, max_pages)):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                try:
+                    page_text = textpage.get_text_range()
+                finally:
+                    # Release PDFium handles as we go rather than at document close
+                    textpage.close()
+                    page.close()
+                pages_extracted += 1
+                # Stop at the cap (keep ~50k chars for context) rather than extracting tail pages
+                if page_text and not buffer.add(f"--- Page {i+1} ---\n{page_text}"):
+                    break
+        finally:
+            pdf.close()
+
+        full_text = buffer.getvalue()
 
         metadata = {
             "type": "pdf",
             "total_pages": num_pages,
             "pages_extracted": pages_extracted,
             "char_count": len(full_text),
-            "truncated": len(full_text) >= 50000
+            "truncated": buffer.full
         }
 
         return full_text, metadata
@@ -80,6 +137,10 @@ def extract_text_from_docx(file_path: str) -> Tuple[str, dict]:
     """
     Extract text content from a DOCX file.
 
+    Streams word/document.xml straight out of the zip instead of building a
+    python-docx object tree, and stops once the character cap is reached.
+    Paragraphs and table rows are emitted in document order.
+
     Args:
         file_path: Path to the DOCX file
 
@@ -87,34 +148,67 @@ def extract_text_from_docx(file_path: str) -> Tuple[str, dict]:
         Tuple of (extracted_text, metadata_dict)
     """
     try:
-        from docx import Document
-
-        doc = Document(file_path)
-
-        text_parts = []
-        for para in doc.paragraphs:
-            if para.text.strip():
-                text_parts.append(para.text)
-
-        # Also extract from tables
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = " | ".join(cell.text.strip() for cell in row.cells if cell.text.strip())
-                if row_text:
-                    text_parts.append(row_text)
-
-        full_text = "\n\n".join(text_parts)
-
-        # Truncate if too long
-        if len(full_text) > 50000:
-            full_text = full_text[:50000] + "\n\n[... content truncated ...]"
+        buffer = _BoundedText()
+        paragraphs = tables = 0
+        table_depth = props_depth = 0
+        runs = []       # text of the paragraph being read
+        cells = []      # stack of paragraph texts, one list per open table cell
+        row_cells = []  # stack of cell texts, one list per open table row
+
+        with zipfile.ZipFile(file_path) as docx, docx.open("word/document.xml") as xml:
+            for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == _W_PPR:
+                        props_depth += 1  # tab stops in paragraph properties aren't text
+                    elif tag == _W_TBL:
+                        table_depth += 1
+                    elif tag == _W_TR:
+                        row_cells.append([])
+                    elif tag == _W_TC:
+                        cells.append([])
+                    continue
+
+                if tag == _W_T:
+                    runs.append(elem.text or "")
+                elif tag == _W_TAB and not props_depth:
+                    runs.append("\t")
+                elif tag in (_W_BR, _W_CR):
+                    runs.append("\n")
+                elif tag == _W_PPR:
+                    props_depth -= 1
+                elif tag == _W_P:
+                    text = "".join(runs)
+                    runs.clear()
+                    elem.clear()
+                    if cells:
+                        cells[-1].append(text)
+                    else:
+                        paragraphs += 1
+                        if text.strip() and not buffer.add(text):
+                            break
+                elif tag == _W_TC:
+                    cell_text = "\n".join(cells.pop()).strip()
+                    if cell_text and row_cells:
+                        row_cells[-1].append(cell_text)
+                elif tag == _W_TR:
+                    row_text = " | ".join(row_cells.pop())
+                    elem.clear()
+                    if row_text and not buffer.add(row_text):
+                        break
+                elif tag == _W_TBL:
+                    table_depth -= 1
+                    if not table_depth:
+                        tables += 1
+
+        full_text = buffer.getvalue()
 
         metadata = {
             "type": "docx",
-            "paragraphs": len(doc.paragraphs),
-            "tables": len(doc.tables),
+            "paragraphs": paragraphs,
+            "tables": tables,
             "char_count": len(full_text),
-            "truncated": len(full_text) >= 50000
+            "truncated": buffer.full
         }
 
         return full_text, metadata
@@ -134,13 +228,14 @@ def extract_text_from_txt(file_path: str) -> Tuple[str, dict]:
         Tuple of (text_content, metadata_dict)
     """
     try:
+        # Read at most one char past the cap so large files are never fully loaded
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+            content = f.read(MAX_EXTRACTED_CHARS + 1)
 
         # Truncate if too long
         truncated = False
-        if len(content) > 50000:
-            content = content[:50000] + "\n\n[... content truncated ...]"
+        if len(content) > MAX_EXTRACTED_CHARS:
+            content = content[:MAX_EXTRACTED_CHARS] + TRUNCATION_NOTICE
             truncated = True
 
         metadata = {
@@ -156,6 +251,15 @@ def extract_text_from_txt(file_path: str) -> Tuple[str, dict]:
         return f"Error reading text file: {str(e)}", {"type": "text", "error": str(e)}
 
 
+# Extension -> extractor dispatch for uploaded files
+TEXT_EXTENSIONS = frozenset({'.txt', '.md', '.csv', '.json', '.py', '.js', '.html', '.css'})
+_EXTRACTORS = {
+    '.pdf': extract_text_from_pdf,
+    '.docx': extract_text_from_docx,
+    **{ext: extract_text_from_txt for ext in TEXT_EXTENSIONS},
+}
+
+
 def process_uploaded_file(file_path: str, file_name: str) -> Tuple[str, dict]:
     """
     Process an uploaded file and extract its text content.
@@ -167,16 +271,11 @@ def process_uploaded_file(file_path: str, file_name: str) -> Tuple[str, dict]:
     Returns:
         Tuple of (extracted_text, metadata_dict)
     """
-    ext = Path(file_name).suffix.lower()
-
-    if ext == '.pdf':
-        return extract_text_from_pdf(file_path)
-    elif ext == '.docx':
-        return extract_text_from_docx(file_path)
-    elif ext in ['.txt', '.md', '.csv', '.json', '.py', '.js', '.html', '.css']:
-        return extract_text_from_txt(file_path)
-    else:
+    ext = _ext(file_name)
+    extractor = _EXTRACTORS.get(ext)
+    if extractor is None:
         return f"Unsupported file type: {ext}", {"type": "unsupported", "extension": ext}
+    return extractor(file_path)
 
 
 def format_file_context(file_name: str, content: str, metadata: dict) -> str:
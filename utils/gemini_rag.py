@@ -5,23 +5,50 @@ Handles file upload and caching for workshop materials
 
 import os
 import sys
-import json
+import asyncio
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from google import genai
-from google.genai import types
+# google.genai is imported where it is used, so the CLI and the chat app's
+# config lookups don't pay the SDK import cost up front
+
+# orjson (C-accelerated) for the cache config file, falling back to stdlib json
+try:
+    import orjson
+
+    def _loads(data: bytes):
+        return orjson.loads(data)
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    import json
+
+    def _loads(data: bytes):
+        return json.loads(data)
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
 
 # Cache configuration file
 CACHE_CONFIG_FILE = Path(__file__).parent.parent / ".gemini_caches.json"
 
+# Parsed cache configs, reused until the file's mtime changes
+_configs_cache = None
+_configs_mtime = None
+
+@lru_cache(maxsize=1)
 def get_client():
-    """Get Gemini client."""
+    """Get Gemini client (created once; a missing key raises and is not cached)."""
     api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_AI_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not found in environment")
+    from google import genai
     return genai.Client(api_key=api_key)
 
 
@@ -36,6 +63,8 @@ def upload_file(file_path: str, display_name: str = None) -> dict:
     Returns:
         dict with file info (name, uri, mime_type)
     """
+    from google.genai import types
+
     client = get_client()
 
     if display_name is None:
@@ -43,10 +72,19 @@ def upload_file(file_path: str, display_name: str = None) -> dict:
 
     print(f"Uploading {display_name}...")
 
-    uploaded_file = client.files.upload(
-        file=file_path,
-        config=types.UploadFileConfig(display_name=display_name)
-    )
+    # With a known mime type, stream from an open handle and skip the SDK's path sniffing
+    mime_type = mimetypes.guess_type(file_path)[0]
+    if mime_type:
+        with open(file_path, "rb") as fh:
+            uploaded_file = client.files.upload(
+                file=fh,
+                config=types.UploadFileConfig(display_name=display_name, mime_type=mime_type)
+            )
+    else:
+        uploaded_file = client.files.upload(
+            file=file_path,
+            config=types.UploadFileConfig(display_name=display_name)
+        )
 
     print(f"  -> Uploaded: {uploaded_file.name}")
 
@@ -78,13 +116,15 @@ def create_workshop_cache(
     Returns:
         Cache name/ID
     """
+    from google.genai import types
+
     client = get_client()
 
-    # Upload all files
+    # Upload all files in parallel (network-bound); map() keeps input order
     uploaded_files = []
-    for file_path in file_paths:
-        file_info = upload_file(file_path)
-        uploaded_files.append(file_info)
+    if file_paths:
+        with ThreadPoolExecutor(max_workers=min(8, len(file_paths))) as executor:
+            uploaded_files = list(executor.map(upload_file, file_paths))
 
     # Create content parts from uploaded files
     parts = []
@@ -128,22 +168,35 @@ def create_workshop_cache(
 
 
 def save_cache_config(workshop_id: str, config: dict):
-    """Save cache configuration to file."""
-    all_configs = load_all_cache_configs()
-    all_configs[workshop_id] = config
+    """Save cache configuration to file (atomically, via temp file + rename)."""
+    global _configs_cache, _configs_mtime
+
+    all_configs = {**load_all_cache_configs(), workshop_id: config}
+
+    tmp_path = CACHE_CONFIG_FILE.with_suffix(".json.tmp")
+    tmp_path.write_bytes(_dumps(all_configs))
+    os.replace(tmp_path, CACHE_CONFIG_FILE)
 
-    with open(CACHE_CONFIG_FILE, "w") as f:
-        json.dump(all_configs, f, indent=2)
+    _configs_cache = all_configs
+    _configs_mtime = CACHE_CONFIG_FILE.stat().st_mtime_ns
 
     print(f"  -> Config saved to {CACHE_CONFIG_FILE}")
 
 
 def load_all_cache_configs() -> dict:
-    """Load all cache configurations from file."""
-    if CACHE_CONFIG_FILE.exists():
-        with open(CACHE_CONFIG_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    """Load all cache configurations from file (re-parsed only when the file changes)."""
+    global _configs_cache, _configs_mtime
+
+    try:
+        mtime = CACHE_CONFIG_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        _configs_cache = _configs_mtime = None
+        return {}
+
+    if _configs_cache is None or mtime != _configs_mtime:
+        _configs_cache = _loads(CACHE_CONFIG_FILE.read_bytes())
+        _configs_mtime = mtime
+    return _configs_cache
 
 
 def get_cache_name(workshop_id: str) -> str:
@@ -154,6 +207,34 @@ def get_cache_name(workshop_id: str) -> str:
     return None
 
 
+async def aload_all_cache_configs() -> dict:
+    """
+    Async variant of load_all_cache_configs for event-loop callers.
+    The freshness check is a single stat; only re-reading a changed file is moved off the loop.
+    """
+    try:
+        mtime = CACHE_CONFIG_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    if _configs_cache is not None and mtime == _configs_mtime:
+        return _configs_cache
+    return await asyncio.to_thread(load_all_cache_configs)
+
+
+async def asave_cache_config(workshop_id: str, config: dict):
+    """Async variant of save_cache_config (runs the write in a worker thread)."""
+    await asyncio.to_thread(save_cache_config, workshop_id, config)
+
+
+async def aget_cache_name(workshop_id: str) -> str:
+    """Async variant of get_cache_name."""
+    configs = await aload_all_cache_configs()
+    if workshop_id in configs:
+        return configs[workshop_id].get("cache_name")
+    return None
+
+
 def refresh_cache(workshop_id: str) -> str:
     """
     Refresh/recreate a cache for a workshop.
@@ -196,6 +277,14 @@ def delete_cache(cache_name: str):
 # Workshop-specific setup functions
 # ============================================================
 
+def _verify_files_exist(base_path: Path, file_paths: list):
+    """Check workshop files against a single listing of their directory."""
+    existing = {entry.name for entry in os.scandir(base_path)}
+    for fp in file_paths:
+        if fp.name not in existing:
+            raise FileNotFoundError(f"File not found: {fp}")
+
+
 def setup_ackoff_cache():
     """
     Set up the Ackoff's Pyramid workshop cache with all materials.
@@ -211,10 +300,7 @@ def setup_ackoff_cache():
         base_path / "Worksheet.txt",
     ]
 
-    # Verify files exist
-    for fp in file_paths:
-        if not fp.exists():
-            raise FileNotFoundError(f"File not found: {fp}")
+    _verify_files_exist(base_path, file_paths)
 
     cache_name = create_workshop_cache(
         workshop_id="ackoff",
@@ -246,10 +332,7 @@ def setup_domain_cache():
         base_path / "Worksheet.txt",
     ]
 
-    # Verify files exist
-    for fp in file_paths:
-        if not fp.exists():
-            raise FileNotFoundError(f"File not found: {fp}")
+    _verify_files_exist(base_path, file_paths)
 
     cache_name = create_workshop_cache(
         workshop_id="domain",
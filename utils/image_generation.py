@@ -5,13 +5,17 @@ Generates images from text prompts using Google's Imagen models.
 
 import os
 import io
+import re
+import time
+import asyncio
 import base64
+import hashlib
 import tempfile
 from datetime import datetime
-from typing import Optional, Dict, Any, List, Tuple
-
-from google import genai
-from google.genai import types
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Mapping, Tuple
 
 # Configuration
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_AI_API_KEY")
@@ -41,16 +45,59 @@ IMAGE_SIZES = {
     "large": "2048x2048",
 }
 
-# Gemini client singleton
-_client = None
+@lru_cache(maxsize=1)
+def get_client():
+    """Get or create the Gemini client (None if GOOGLE_API_KEY is not set)."""
+    if not GOOGLE_API_KEY:
+        return None
+    from google import genai  # deferred: heavy SDK import, not needed for intent detection
+    return genai.Client(api_key=GOOGLE_API_KEY)
+
 
+# On-disk cache of generated images, so repeated prompts don't re-hit the paid API
+IMAGE_CACHE_DIR = Path(tempfile.gettempdir()) / "mindrian_imggen"
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", 6 * 3600))  # seconds; 0 disables
 
-def get_client():
-    """Get or create Gemini client."""
-    global _client
-    if _client is None and GOOGLE_API_KEY:
-        _client = genai.Client(api_key=GOOGLE_API_KEY)
-    return _client
+
+def _image_cache_key(full_prompt: str, model_name: str, ratio: str) -> str:
+    return hashlib.sha256(f"{full_prompt}|{model_name}|{ratio}".encode()).hexdigest()
+
+
+def _read_cached_image(key: str) -> Optional[Tuple[bytes, str]]:
+    """Return (image_bytes, mime_type) for a fresh cache entry, else None."""
+    path = IMAGE_CACHE_DIR / key
+    try:
+        if time.time() - path.stat().st_mtime >= IMAGE_CACHE_TTL:
+            path.unlink(missing_ok=True)
+            return None
+        # Entry format: mime type, newline, raw image bytes
+        mime_type, image_bytes = path.read_bytes().split(b"\n", 1)
+        return image_bytes, mime_type.decode()
+    except (OSError, ValueError):
+        return None
+
+
+def _prune_image_cache():
+    """Delete cache entries (and stray temp files) older than IMAGE_CACHE_TTL."""
+    cutoff = time.time() - IMAGE_CACHE_TTL
+    for entry in os.scandir(IMAGE_CACHE_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except OSError:
+            pass  # removed concurrently
+
+
+def _write_cached_image(key: str, image_bytes: bytes, mime_type: str):
+    """Store a generated image (atomically, via temp file + rename). Failures are non-fatal."""
+    try:
+        IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=IMAGE_CACHE_DIR, delete=False) as f:
+            f.write(mime_type.encode() + b"\n" + image_bytes)
+        os.replace(f.name, IMAGE_CACHE_DIR / key)
+        _prune_image_cache()
+    except OSError as e:
+        print(f"Image cache write error: {e}")
 
 
 async def generate_image(
@@ -59,6 +106,7 @@ async def generate_image(
     aspect_ratio: str = "square",
     negative_prompt: Optional[str] = None,
     style_preset: Optional[str] = None,
+    use_cache: bool = False,
 ) -> Tuple[Optional[bytes], Optional[str], Dict[str, Any]]:
     """
     Generate an image from a text prompt using Gemini Imagen.
@@ -69,6 +117,8 @@ async def generate_image(
         aspect_ratio: Aspect ratio ("square", "landscape", "portrait", "wide", "photo")
         negative_prompt: Things to avoid in the image
         style_preset: Optional style hint (e.g., "photorealistic", "illustration", "3d render")
+        use_cache: Opt in to reusing a recent result for an identical request
+            (skipped with negative_prompt). Leave off wherever the user expects a new image.
 
     Returns:
         Tuple of (image_bytes, mime_type, metadata)
@@ -78,6 +128,8 @@ async def generate_image(
     if not client:
         return None, None, {"error": "Gemini client not configured. Check GOOGLE_API_KEY."}
 
+    from google.genai import types
+
     # Build the full prompt
     full_prompt = prompt
     if style_preset:
@@ -98,14 +150,25 @@ async def generate_image(
         "timestamp": datetime.utcnow().isoformat(),
     }
 
-    try:
-        # Use the flash model with image generation capability
-        model_name = IMAGEN_MODELS.get(model, IMAGEN_MODELS["fast"])
+    # Use the flash model with image generation capability
+    model_name = IMAGEN_MODELS.get(model, IMAGEN_MODELS["fast"])
+
+    cache_key = None
+    if use_cache and not negative_prompt and IMAGE_CACHE_TTL > 0:
+        cache_key = _image_cache_key(full_prompt, model_name, ratio)
+        cached = await asyncio.to_thread(_read_cached_image, cache_key)
+        if cached:
+            image_bytes, mime_type = cached
+            metadata["success"] = True
+            metadata["cached"] = True
+            metadata["size_bytes"] = len(image_bytes)
+            return image_bytes, mime_type, metadata
 
+    try:
         # For gemini-2.0-flash-exp, we use a different approach
         if "flash" in model_name or "gemini" in model_name:
             # Use multimodal generation with image output
-            response = client.models.generate_content(
+            response = await client.aio.models.generate_content(
                 model=model_name,
                 contents=f"Generate an image: {full_prompt}",
                 config=types.GenerateContentConfig(
@@ -123,6 +186,8 @@ async def generate_image(
 
                         metadata["success"] = True
                         metadata["size_bytes"] = len(image_bytes)
+                        if cache_key:
+                            await asyncio.to_thread(_write_cached_image, cache_key, image_bytes, mime_type)
                         return image_bytes, mime_type, metadata
 
             # Check if there's text response (model might explain why it can't generate)
@@ -135,7 +200,7 @@ async def generate_image(
 
         else:
             # For dedicated imagen model
-            response = client.models.generate_images(
+            response = await client.aio.models.generate_images(
                 model=model_name,
                 prompt=full_prompt,
                 config=types.GenerateImagesConfig(
@@ -151,6 +216,8 @@ async def generate_image(
 
                 metadata["success"] = True
                 metadata["size_bytes"] = len(image_bytes)
+                if cache_key:
+                    await asyncio.to_thread(_write_cached_image, cache_key, image_bytes, mime_type)
                 return image_bytes, mime_type, metadata
 
             metadata["error"] = "No image generated"
@@ -193,15 +260,14 @@ async def generate_image_variations(
         List of (image_bytes, mime_type, metadata) tuples
     """
     count = min(max(count, 1), 4)  # Limit to 1-4
-    results = []
 
-    for i in range(count):
-        # Add slight variation to prompt
-        varied_prompt = prompt if i == 0 else f"{prompt} (variation {i+1})"
-        result = await generate_image(varied_prompt, model, aspect_ratio)
-        results.append(result)
+    # Add slight variation to prompt
+    prompts = [prompt if i == 0 else f"{prompt} (variation {i+1})" for i in range(count)]
 
-    return results
+    # Generate all variations concurrently (uncached: variations should differ)
+    return list(await asyncio.gather(
+        *(generate_image(varied_prompt, model, aspect_ratio) for varied_prompt in prompts)
+    ))
 
 
 def save_image_to_temp(image_bytes: bytes, mime_type: str = "image/png") -> str:
@@ -233,8 +299,41 @@ def image_to_base64(image_bytes: bytes, mime_type: str = "image/png") -> str:
     Returns:
         Base64 data URL string
     """
-    b64 = base64.b64encode(image_bytes).decode('utf-8')
-    return f"data:{mime_type};base64,{b64}"
+    # Assemble as bytes and decode once, skipping the intermediate base64 str
+    return (b"data:" + mime_type.encode() + b";base64," + base64.b64encode(image_bytes)).decode("ascii")
+
+
+# Direct image generation commands
+GENERATION_TRIGGERS = (
+    "generate an image",
+    "create an image",
+    "draw me",
+    "draw a",
+    "make an image",
+    "generate image",
+    "create image",
+    "make a picture",
+    "visualize",
+    "illustrate",
+    "/imagine",
+    "/generate",
+    "/draw",
+)
+
+# "image of X" style phrasings
+IMAGE_OF_PATTERNS = ("image of", "picture of", "illustration of", "drawing of", "photo of")
+
+# Each list compiled into one case-insensitive alternation, so a message is scanned once per list
+_GENERATION_TRIGGER_RE = re.compile("|".join(map(re.escape, GENERATION_TRIGGERS)), re.IGNORECASE)
+_IMAGE_OF_RE = re.compile("|".join(map(re.escape, IMAGE_OF_PATTERNS)), re.IGNORECASE)
+
+# Leading filler stripped from an extracted prompt ("of a ...", ": that shows ...").
+# Optional groups in sequence, so each prefix is removed at most once and in this order.
+_PROMPT_PREFIX_RE = re.compile(r"^(?:of )?(?:a )?(?:an )?(?:: )?(?:that shows )?", re.IGNORECASE)
+
+# Cheap first pass: every trigger/pattern above contains one of these stems,
+# so ordinary chat messages are rejected after a single short scan
+_INTENT_PREFILTER_RE = re.compile(r"imag|picture|draw|illustr|visualiz|photo|/generate", re.IGNORECASE)
 
 
 def detect_image_generation_intent(message: str) -> Tuple[bool, Optional[str]]:
@@ -247,61 +346,45 @@ def detect_image_generation_intent(message: str) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_image_request, extracted_prompt)
     """
-    message_lower = message.lower().strip()
-
-    # Direct commands
-    generation_triggers = [
-        "generate an image",
-        "create an image",
-        "draw me",
-        "draw a",
-        "make an image",
-        "generate image",
-        "create image",
-        "make a picture",
-        "visualize",
-        "illustrate",
-        "/imagine",
-        "/generate",
-        "/draw",
-    ]
-
-    for trigger in generation_triggers:
-        if trigger in message_lower:
-            # Extract the prompt after the trigger
-            idx = message_lower.find(trigger)
-            prompt = message[idx + len(trigger):].strip()
-            # Clean up common prefixes
-            for prefix in ["of ", "a ", "an ", ": ", "that shows "]:
-                if prompt.lower().startswith(prefix):
-                    prompt = prompt[len(prefix):]
-            return True, prompt if prompt else None
+    if not _INTENT_PREFILTER_RE.search(message):
+        return False, None
+
+    # Direct commands take priority over "image of X" phrasings
+    match = _GENERATION_TRIGGER_RE.search(message)
+    if match:
+        # Extract the prompt after the trigger
+        prompt = message[match.end():].strip()
+        # Clean up common prefixes
+        prompt = _PROMPT_PREFIX_RE.sub("", prompt, count=1)
+        return True, prompt if prompt else None
 
     # Check for "of" pattern: "image of X", "picture of X"
-    image_of_patterns = ["image of", "picture of", "illustration of", "drawing of", "photo of"]
-    for pattern in image_of_patterns:
-        if pattern in message_lower:
-            idx = message_lower.find(pattern)
-            prompt = message[idx + len(pattern):].strip()
-            return True, prompt if prompt else None
+    match = _IMAGE_OF_RE.search(message)
+    if match:
+        prompt = message[match.end():].strip()
+        return True, prompt if prompt else None
 
     return False, None
 
 
-def get_style_presets() -> Dict[str, str]:
+# Style presets with descriptions (read-only view, shared by every caller)
+STYLE_PRESETS = MappingProxyType({
+    "photorealistic": "Realistic photograph style",
+    "illustration": "Digital illustration style",
+    "watercolor": "Watercolor painting style",
+    "oil_painting": "Oil painting style",
+    "3d_render": "3D rendered style",
+    "anime": "Anime/manga style",
+    "sketch": "Pencil sketch style",
+    "pixel_art": "Pixel art style",
+    "minimalist": "Minimalist, clean style",
+    "vintage": "Vintage/retro style",
+})
+
+
+def get_style_presets() -> Mapping[str, str]:
     """Get available style presets with descriptions."""
-    return {
-        "photorealistic": "Realistic photograph style",
-        "illustration": "Digital illustration style",
-        "watercolor": "Watercolor painting style",
-        "oil_painting": "Oil painting style",
-        "3d_render": "3D rendered style",
-        "anime": "Anime/manga style",
-        "sketch": "Pencil sketch style",
-        "pixel_art": "Pixel art style",
-        "minimalist": "Minimalist, clean style",
-        "vintage": "Vintage/retro style",
-    }
+    return STYLE_PRESETS
 
 
 def is_image_generation_configured() -> bool:
@@ -4,11 +4,26 @@ Voice (ElevenLabs), Images, PDFs, Files, Videos, and more
 """
 
 import os
-import io
+import re
+import time
+import asyncio
+import hashlib
+import mimetypes
 import tempfile
 import chainlit as cl
-from typing import Optional, Dict
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from typing import Optional, Dict, NamedTuple, Tuple
 from pathlib import Path
+from urllib.parse import urlparse
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
 
 # ElevenLabs Configuration
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
@@ -42,8 +57,16 @@ def get_elevenlabs_client():
             print("⚠️ [ELEVENLABS] ELEVENLABS_API_KEY not set - voice features disabled")
             return None
         try:
+            import httpx
             from elevenlabs import ElevenLabs
-            _elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+            # Explicit keep-alive pool so repeated TTS calls reuse TCP/TLS connections
+            _elevenlabs_client = ElevenLabs(
+                api_key=ELEVENLABS_API_KEY,
+                httpx_client=httpx.Client(
+                    limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+                    timeout=30.0,
+                ),
+            )
             print(f"✅ [ELEVENLABS] Client initialized (key: ...{ELEVENLABS_API_KEY[-4:] if len(ELEVENLABS_API_KEY) > 4 else '****'})")
         except ImportError as e:
             print(f"⚠️ [ELEVENLABS] Package not installed: {e}")
@@ -55,6 +78,156 @@ def get_elevenlabs_client():
     return _elevenlabs_client
 
 
+@lru_cache(maxsize=16)
+def _voice_settings(stability: float, similarity_boost: float, use_speaker_boost: bool):
+    """VoiceSettings for a parameter combination (imported and built once, not per TTS call)."""
+    from elevenlabs import VoiceSettings
+    return VoiceSettings(
+        stability=stability,
+        similarity_boost=similarity_boost,
+        use_speaker_boost=use_speaker_boost
+    )
+
+
+# Persistent TTS cache: repeated phrases (greetings, canned replies) skip the paid API call.
+# Bounded by size; the least recently used files are evicted first.
+TTS_CACHE_DIR = Path(os.getenv("MINDRIAN_TTS_CACHE", Path.home() / ".cache" / "mindrian" / "tts"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("MINDRIAN_TTS_CACHE_MAX_MB", 200)) * 1024 * 1024
+
+
+def _tts_cache_path(text: str, voice_id: str, model_id: str, *voice_settings) -> Path:
+    """Cache file for a synthesis request (everything that affects the audio is in the key)."""
+    key = "|".join(map(str, (model_id, voice_id, *voice_settings, text)))
+    return TTS_CACHE_DIR / f"{hashlib.sha256(key.encode()).hexdigest()}.mp3"
+
+
+def _tts_cache_hit(path: Path) -> bool:
+    """True if path is cached; bumps its mtime so eviction is least-recently-used."""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return path.exists()  # read-only cache: still usable, just not reordered
+
+
+def _prune_tts_cache(keep: str):
+    """Evict the least recently used cached MP3s (never keep) until the cache fits TTS_CACHE_MAX_BYTES."""
+    files = []
+    total = 0
+    for entry in os.scandir(TTS_CACHE_DIR):
+        if entry.name.endswith(".mp3"):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+    if total <= TTS_CACHE_MAX_BYTES:
+        return
+    files.sort()
+    for _, size, path in files:
+        if path == keep:
+            continue
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= TTS_CACHE_MAX_BYTES:
+            break
+
+
+def _write_audio_stream(audio_stream, dest: Path) -> Optional[str]:
+    """
+    Write audio chunks straight to disk as they arrive, instead of buffering the whole file.
+    The MP3 is only moved into place at dest once complete, so readers never see a partial file.
+    If the cache directory can't be written, the audio goes to an uncached temp file instead.
+
+    Returns:
+        Path to the MP3, or None if the audio was too small to be valid
+    """
+    try:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        audio_file = tempfile.NamedTemporaryFile(delete=False, dir=dest.parent, suffix=".mp3.tmp")
+    except OSError as e:
+        print(f"TTS cache unavailable ({e}); using a temp file")
+        dest = None
+        audio_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
+
+    total_bytes = 0
+    try:
+        with audio_file:
+            for chunk in audio_stream:
+                if isinstance(chunk, bytes):
+                    audio_file.write(chunk)
+                    total_bytes += len(chunk)
+    except Exception:
+        os.unlink(audio_file.name)
+        raise
+
+    if total_bytes < 100:
+        print("ElevenLabs: Audio data too small, possibly corrupt")
+        os.unlink(audio_file.name)
+        return None
+
+    if dest is None:
+        return audio_file.name
+
+    os.replace(audio_file.name, dest)
+    try:
+        _prune_tts_cache(keep=str(dest))
+    except OSError as e:
+        print(f"TTS cache prune error: {e}")
+    return str(dest)
+
+
+# In-flight synthesis locks, keyed by cache file name
+_tts_inflight: Dict[str, asyncio.Lock] = {}
+
+
+def _tts_audio_element(path) -> cl.Audio:
+    """Audio element for a synthesized MP3."""
+    return cl.Audio(
+        path=str(path),
+        mime="audio/mpeg",
+        name="response.mp3"
+    )
+
+
+async def _synthesize_to_cache(
+    text: str,
+    voice_id: str,
+    model_id: str,
+    stability: float,
+    similarity_boost: float,
+    use_speaker_boost: bool,
+    cache_path: Path
+) -> Optional[str]:
+    """Call ElevenLabs and stream the audio into cache_path. Returns the path, or None on failure."""
+    client = get_elevenlabs_client()
+    if not client:
+        return None
+
+    try:
+        # Use streaming for better perceived latency
+        audio_stream = client.text_to_speech.convert_as_stream(
+            text=text,
+            voice_id=voice_id,
+            model_id=model_id,
+            voice_settings=_voice_settings(stability, similarity_boost, use_speaker_boost)
+        )
+
+        # The stream is a blocking generator (network reads happen while iterating),
+        # so drain it into the cache in a worker thread to keep the event loop free
+        return await asyncio.to_thread(_write_audio_stream, audio_stream, cache_path)
+
+    except Exception as e:
+        print(f"ElevenLabs TTS error: {e}")
+        return None
+
+
 async def text_to_speech(
     text: str,
     voice_id: str = None,
@@ -65,6 +238,7 @@ async def text_to_speech(
 ) -> Optional[cl.Audio]:
     """
     Convert text to speech using ElevenLabs API with streaming.
+    Audio is cached on disk (TTS_CACHE_DIR), so repeated requests skip the API.
 
     Args:
         text: Text to convert to speech (max 5000 chars)
@@ -81,50 +255,29 @@ async def text_to_speech(
         print("ElevenLabs API key not configured")
         return None
 
-    client = get_elevenlabs_client()
-    if not client:
-        return None
-
-    try:
-        from elevenlabs import VoiceSettings
+    # Truncate text to ElevenLabs limit
+    text = text[:5000]
+    voice_id = voice_id or ELEVENLABS_VOICE_ID
+    model_id = model_id or DEFAULT_MODEL
 
-        # Truncate text to ElevenLabs limit
-        text = text[:5000]
+    cache_path = _tts_cache_path(text, voice_id, model_id, stability, similarity_boost, use_speaker_boost)
+    if _tts_cache_hit(cache_path):
+        return _tts_audio_element(cache_path)
 
-        # Use streaming for better perceived latency
-        audio_stream = client.text_to_speech.convert_as_stream(
-            text=text,
-            voice_id=voice_id or ELEVENLABS_VOICE_ID,
-            model_id=model_id or DEFAULT_MODEL,
-            voice_settings=VoiceSettings(
-                stability=stability,
-                similarity_boost=similarity_boost,
-                use_speaker_boost=use_speaker_boost
+    # Concurrent requests for the same audio (e.g. a greeting at startup) wait for one API call
+    lock = _tts_inflight.setdefault(cache_path.name, asyncio.Lock())
+    try:
+        async with lock:
+            if _tts_cache_hit(cache_path):
+                return _tts_audio_element(cache_path)
+            audio_path = await _synthesize_to_cache(
+                text, voice_id, model_id, stability, similarity_boost, use_speaker_boost, cache_path
             )
-        )
+    finally:
+        if not lock.locked() and _tts_inflight.get(cache_path.name) is lock:
+            del _tts_inflight[cache_path.name]
 
-        # Collect audio bytes from stream
-        audio_buffer = io.BytesIO()
-        for chunk in audio_stream:
-            if isinstance(chunk, bytes):
-                audio_buffer.write(chunk)
-
-        audio_bytes = audio_buffer.getvalue()
-
-        if len(audio_bytes) < 100:
-            print("ElevenLabs: Audio data too small, possibly corrupt")
-            return None
-
-        # Return audio element with correct MIME type
-        return cl.Audio(
-            content=audio_bytes,
-            mime="audio/mpeg",
-            name="response.mp3"
-        )
-
-    except Exception as e:
-        print(f"ElevenLabs TTS error: {e}")
-        return None
+    return _tts_audio_element(audio_path) if audio_path else None
 
 
 async def text_to_speech_fast(
@@ -207,7 +360,7 @@ async def create_image_element(
 async def create_file_download(
     content: str,
     filename: str,
-    mime_type: str = "text/markdown"
+    mime_type: Optional[str] = None
 ) -> cl.File:
     """
     Create a downloadable file from text content.
@@ -215,23 +368,27 @@ async def create_file_download(
     Args:
         content: Text content
         filename: Download filename
-        mime_type: MIME type
+        mime_type: MIME type (guessed from the filename extension when omitted)
 
     Returns:
         cl.File element
     """
-    # Save to temp file
-    temp_path = tempfile.mktemp(suffix=Path(filename).suffix)
-    with open(temp_path, "w", encoding="utf-8") as f:
-        f.write(content)
-
+    # Hand the bytes straight to Chainlit; no temp file to write, read back and prune
     return cl.File(
         name=filename,
-        path=temp_path,
+        content=content.encode("utf-8"),
+        mime=mime_type or mimetypes.guess_type(filename)[0],
         display="inline"
     )
 
 
+# Checklist marks for phase status in exported summaries
+_PHASE_STATUS_MARKS = {"done": "[x]", "running": "[~]", "ready": "[ ]", "pending": "[ ]"}
+
+# Speaker labels in exported summaries (any non-user role is Larry)
+_ROLE_PREFIXES = {"user": "**You:** ", "assistant": "**Larry:** "}
+
+
 async def export_workshop_summary(
     bot_name: str,
     phases: list,
@@ -251,26 +408,27 @@ async def export_workshop_summary(
         cl.File element for download
     """
     # Build markdown summary
-    md = f"# {bot_name} Workshop Summary\n\n"
-    md += f"**Generated:** {__import__('datetime').datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
+    parts = [
+        f"# {bot_name} Workshop Summary\n\n",
+        f"**Generated:** {datetime.now():%Y-%m-%d %H:%M}\n\n",
+        "## Workshop Progress\n\n",
+    ]
 
     # Phase progress
-    md += "## Workshop Progress\n\n"
     for i, phase in enumerate(phases):
-        status = phase.get("status", "pending")
-        emoji = {"done": "[x]", "running": "[~]", "ready": "[ ]", "pending": "[ ]"}.get(status, "[ ]")
+        emoji = _PHASE_STATUS_MARKS.get(phase.get("status", "pending"), "[ ]")
         current = " <- Current" if i == current_phase else ""
-        md += f"- {emoji} **Phase {i+1}:** {phase['name']}{current}\n"
-
-    # Conversation highlights
-    md += "\n## Key Discussion Points\n\n"
-    for msg in history[-20:]:  # Last 20 messages
-        role = msg.get("role", "user")
-        content = msg.get("content", "")[:500]
-        if role == "user":
-            md += f"**You:** {content}\n\n"
-        else:
-            md += f"**Larry:** {content}\n\n"
+        parts.append(f"- {emoji} **Phase {i+1}:** {phase['name']}{current}\n")
+
+    # Conversation highlights (last 20 messages, without copying the history)
+    parts.append("\n## Key Discussion Points\n\n")
+    larry = _ROLE_PREFIXES["assistant"]
+    for msg in islice(history, max(0, len(history) - 20), None):
+        parts.append(_ROLE_PREFIXES.get(msg.get("role", "user"), larry))
+        parts.append((msg.get("content") or "")[:500])
+        parts.append("\n\n")
+
+    md = "".join(parts)
 
     return await create_file_download(
         content=md,
@@ -286,20 +444,85 @@ FRAMEWORK_IMAGES = {
     "design_thinking": "https://upload.wikimedia.org/wikipedia/commons/b/bd/Double_diamond.png",
 }
 
+# Common spellings resolve to their key without lowercasing; anything else falls back to .lower()
+_FRAMEWORK_LOOKUP = {}
+for _key in FRAMEWORK_IMAGES:
+    _FRAMEWORK_LOOKUP[_key] = _FRAMEWORK_LOOKUP[_key.upper()] = _FRAMEWORK_LOOKUP[_key.title()] = _key
+del _key
+
+# Diagrams prefetched by scripts/prefetch_frameworks.py, served from Chainlit's /public mount
+FRAMEWORK_STATIC_DIR = Path(__file__).parent.parent / "public" / "frameworks"
+
+
+def framework_static_filename(key: str) -> str:
+    """File name of a framework diagram under public/frameworks (key + the source URL's extension)."""
+    return key + Path(urlparse(FRAMEWORK_IMAGES[key]).path).suffix
+
+
+# Local disk cache for framework diagrams, so clients don't refetch third-party hosts
+FRAMEWORK_IMAGE_CACHE_DIR = Path(tempfile.gettempdir()) / "mindrian_fw"
+FRAMEWORK_IMAGE_CACHE_TTL = 24 * 3600  # 24 hours
+
+
+async def _get_cached_image_path(url: str) -> Optional[str]:
+    """
+    Get a local copy of a remote image, refetching it once the TTL expires.
+
+    Returns:
+        Local file path, or None if the image couldn't be fetched and isn't cached
+    """
+    cache_path = FRAMEWORK_IMAGE_CACHE_DIR / (
+        hashlib.sha1(url.encode()).hexdigest() + Path(urlparse(url).path).suffix
+    )
+    try:
+        is_fresh = time.time() - cache_path.stat().st_mtime < FRAMEWORK_IMAGE_CACHE_TTL
+    except FileNotFoundError:
+        is_fresh = None
+    if is_fresh:
+        return str(cache_path)
+
+    try:
+        import httpx
+        async with httpx.AsyncClient(timeout=5.0, follow_redirects=True) as client:
+            response = await client.get(url, headers={"User-Agent": "Mindrian/1.0"})
+            response.raise_for_status()
+
+        # Write atomically so concurrent readers never see a partial image
+        FRAMEWORK_IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=FRAMEWORK_IMAGE_CACHE_DIR, delete=False) as f:
+            f.write(response.content)
+        os.replace(f.name, cache_path)
+        return str(cache_path)
+    except Exception as e:
+        print(f"Framework image fetch error: {e}")
+        # A stale copy is better than hotlinking
+        return str(cache_path) if is_fresh is not None else None
+
 
 async def get_framework_image(framework: str) -> Optional[cl.Image]:
     """
     Get a framework diagram image.
 
+    Served from public/frameworks when prefetched, then from a local cache,
+    falling back to the remote URL.
+
     Args:
         framework: Framework name (dikw, jtbd, scurve, etc.)
 
     Returns:
         cl.Image element or None
     """
-    url = FRAMEWORK_IMAGES.get(framework.lower())
+    key = _FRAMEWORK_LOOKUP.get(framework) or framework.lower()
+    url = FRAMEWORK_IMAGES.get(key)
     if url:
-        return await create_image_element(url=url, name=f"{framework}_diagram", display="inline")
+        name = f"{framework}_diagram"
+        filename = framework_static_filename(key)
+        if (FRAMEWORK_STATIC_DIR / filename).is_file():
+            return await create_image_element(url=f"/public/frameworks/{filename}", name=name, display="inline")
+        path = await _get_cached_image_path(url)
+        if path:
+            return await create_image_element(path=path, name=name, display="inline")
+        return await create_image_element(url=url, name=name, display="inline")
     return None
 
 
@@ -336,6 +559,8 @@ async def create_video_element(
         - Direct MP4: https://example.com/video.mp4
         - Supabase Storage URL
     """
+    # Deliberately not memoized: each cl.Video carries its own element id and is
+    # bound to a message (for_id) when sent, so instances can't be shared.
     if url:
         return cl.Video(
             name=name,
@@ -351,6 +576,11 @@ async def create_video_element(
     return None
 
 
+# All YouTube URL formats (watch, youtu.be, embed, /v/) in one pattern, so a URL is scanned once
+_YOUTUBE_ID_RE = re.compile(r'(?:youtube\.com/(?:watch\?v=|embed/|v/)|youtu\.be/)([a-zA-Z0-9_-]{11})')
+
+
+@lru_cache(maxsize=512)
 def extract_youtube_id(url: str) -> Optional[str]:
     """
     Extract YouTube video ID from various URL formats.
@@ -361,25 +591,20 @@ def extract_youtube_id(url: str) -> Optional[str]:
     Returns:
         Video ID or None
     """
-    import re
-
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([a-zA-Z0-9_-]{11})',
-        r'youtube\.com\/v\/([a-zA-Z0-9_-]{11})',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
+    # Most video URLs (Vimeo, MP4, Supabase) aren't YouTube; skip the regex for them
+    if 'youtu' not in url:
+        return None
+    match = _YOUTUBE_ID_RE.search(url)
+    return match.group(1) if match else None
 
 
+@lru_cache(maxsize=256)
 def get_youtube_embed_url(video_id: str) -> str:
     """Convert YouTube video ID to embed URL."""
     return f"https://www.youtube.com/embed/{video_id}"
 
 
+@lru_cache(maxsize=256)
 def get_youtube_thumbnail(video_id: str, quality: str = "hqdefault") -> str:
     """
     Get YouTube video thumbnail URL.
@@ -441,6 +666,19 @@ WORKSHOP_VIDEOS: Dict[str, Dict[str, str]] = {
 }
 
 
+def _resolve_video_url(url: str) -> str:
+    """Playable URL for a configured video (YouTube links become embed URLs)."""
+    youtube_id = extract_youtube_id(url) if url else None
+    return get_youtube_embed_url(youtube_id) if youtube_id else url
+
+
+# WORKSHOP_VIDEOS with URLs already resolved, so lookups do no parsing
+_WORKSHOP_VIDEOS_RESOLVED: Dict[str, Dict[str, str]] = {
+    bot_id: {phase: _resolve_video_url(url) for phase, url in phases.items()}
+    for bot_id, phases in WORKSHOP_VIDEOS.items()
+}
+
+
 async def get_workshop_video(
     bot_id: str,
     phase: str = "intro"
@@ -455,20 +693,17 @@ async def get_workshop_video(
     Returns:
         cl.Video element or None if no video configured
     """
-    bot_videos = WORKSHOP_VIDEOS.get(bot_id, {})
-    video_url = bot_videos.get(phase, "") or bot_videos.get("intro", "")
+    bot_videos = _WORKSHOP_VIDEOS_RESOLVED.get(bot_id, {})
+    video_url = bot_videos.get(phase, "")
+    if not video_url and phase != "intro":  # fall back to the intro video
+        video_url = bot_videos.get("intro", "")
 
     if not video_url:
         return None
 
-    # Extract YouTube ID if it's a YouTube URL
-    youtube_id = extract_youtube_id(video_url)
-    if youtube_id:
-        video_url = get_youtube_embed_url(youtube_id)
-
-    return await create_video_element(
-        url=video_url,
+    return cl.Video(
         name=f"{bot_id}_{phase}_tutorial",
+        url=video_url,
         display="inline"
     )
 
@@ -487,17 +722,20 @@ async def get_video_with_thumbnail(
     Returns:
         Tuple of (Video element, Thumbnail image element)
     """
-    video = await create_video_element(url=url, name=name)
-    thumbnail = None
-
+    # Parse the URL once; the ID gives both the embed URL and the thumbnail
     youtube_id = extract_youtube_id(url)
-    if youtube_id:
-        thumbnail_url = get_youtube_thumbnail(youtube_id)
-        thumbnail = await create_image_element(
-            url=thumbnail_url,
+    if not youtube_id:
+        return await create_video_element(url=url, name=name), None
+
+    # Independent elements; build them concurrently
+    video, thumbnail = await asyncio.gather(
+        create_video_element(url=get_youtube_embed_url(youtube_id), name=name),
+        create_image_element(
+            url=get_youtube_thumbnail(youtube_id),
             name=f"{name}_thumbnail",
             display="inline"
-        )
+        ),
+    )
 
     return video, thumbnail
 
@@ -511,9 +749,8 @@ def set_workshop_video(bot_id: str, phase: str, url: str):
         phase: Phase identifier
         url: Video URL (YouTube, Vimeo, or direct)
     """
-    if bot_id not in WORKSHOP_VIDEOS:
-        WORKSHOP_VIDEOS[bot_id] = {}
-    WORKSHOP_VIDEOS[bot_id][phase] = url
+    WORKSHOP_VIDEOS.setdefault(bot_id, {})[phase] = url
+    _WORKSHOP_VIDEOS_RESOLVED.setdefault(bot_id, {})[phase] = _resolve_video_url(url)
 
 
 def list_configured_videos() -> Dict[str, list]:
@@ -689,6 +926,134 @@ BOT_TOPIC_MAP = {
 }
 
 
+class Chapter(NamedTuple):
+    """A configured audiobook chapter, flattened out of AUDIOBOOK_CHAPTERS."""
+    topic: str
+    chapter_id: str
+    title: str
+    url: str
+    duration: str
+    keywords: tuple
+    bots: tuple
+
+
+def _build_chapters() -> Tuple[Chapter, ...]:
+    """Configured chapters (those with a URL) in AUDIOBOOK_CHAPTERS order."""
+    return tuple(
+        Chapter(
+            topic=topic,
+            chapter_id=chapter_id,
+            title=chapter.get("title", "Unknown"),
+            url=chapter["url"],
+            duration=chapter.get("duration", ""),
+            keywords=tuple(chapter.get("keywords", ())),
+            bots=tuple(chapter.get("bot_relevance", ())),
+        )
+        for topic, chapters in AUDIOBOOK_CHAPTERS.items()
+        for chapter_id, chapter in chapters.items()
+        if chapter.get("url")
+    )
+
+
+def _build_keyword_index(chapters: Tuple[Chapter, ...]) -> Dict[str, list]:
+    """Map each keyword to the positions in chapters of the chapters using it."""
+    index = {}
+    for position, chapter in enumerate(chapters):
+        for kw in chapter.keywords:
+            index.setdefault(kw, []).append(position)
+    return index
+
+
+def _build_keyword_matcher(index: Dict[str, list]):
+    """Aho-Corasick automaton over the indexed keywords (None if pyahocorasick is missing)."""
+    if not AHOCORASICK_AVAILABLE or not index:
+        return None
+    automaton = ahocorasick.Automaton()
+    for kw in index:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_keyword_regex(index: Dict[str, list]):
+    """
+    Fallback single-pass matcher when pyahocorasick is missing: a lookahead alternation
+    (longest keyword first) reporting the longest keyword starting at each position,
+    plus each keyword's keyword prefixes, which are present wherever it is.
+
+    Returns:
+        Tuple of (compiled pattern, keyword -> keywords it starts with), or None
+    """
+    if not index:
+        return None
+    keywords = sorted(index, key=len, reverse=True)
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, keywords)) + "))")
+    prefixes = {kw: [other for other in keywords if kw.startswith(other)] for kw in keywords}
+    return pattern, prefixes
+
+
+# Lookup structures derived from AUDIOBOOK_CHAPTERS; rebuilt by set_audiobook_chapter
+_CHAPTERS = _build_chapters()
+_KEYWORD_INDEX = _build_keyword_index(_CHAPTERS)
+_KEYWORD_MATCHER = _build_keyword_matcher(_KEYWORD_INDEX)
+_KEYWORD_REGEX = None if _KEYWORD_MATCHER else _build_keyword_regex(_KEYWORD_INDEX)
+
+
+@lru_cache(maxsize=32)
+def _matched_keywords(text: str) -> frozenset:
+    """
+    Indexed keywords occurring in text (case-insensitive).
+    Cached because the same conversation context is often checked on consecutive turns;
+    cleared whenever the index is rebuilt.
+    """
+    # All keywords are found in a single pass over the text
+    text_lower = text.lower()
+    if _KEYWORD_MATCHER is not None:
+        return frozenset(kw for _, kw in _KEYWORD_MATCHER.iter(text_lower))
+    if _KEYWORD_REGEX is None:
+        return frozenset()
+    pattern, prefixes = _KEYWORD_REGEX
+    found = set()
+    for longest in set(pattern.findall(text_lower)):
+        found.update(prefixes[longest])
+    return frozenset(found)
+
+
+def _warm_file_cache(path: str) -> bool:
+    """
+    Ask the OS to start reading a file into the page cache (readahead is skipped where unsupported).
+
+    Returns:
+        False if the file can't be opened
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except (AttributeError, OSError):
+        pass
+    finally:
+        os.close(fd)
+    return True
+
+
+def _prefetch_next_chapter(topic: str, chapter_id: str):
+    """
+    Listeners usually move on to the following chapter, so warm its local file
+    in the background while the current one plays.
+    """
+    chapter_ids = list(AUDIOBOOK_CHAPTERS.get(topic, {}))
+    try:
+        next_id = chapter_ids[chapter_ids.index(chapter_id) + 1]
+    except (ValueError, IndexError):
+        return
+    next_url = AUDIOBOOK_CHAPTERS[topic][next_id].get("url", "")
+    if next_url and not next_url.startswith("http"):
+        asyncio.get_running_loop().run_in_executor(None, _warm_file_cache, next_url)
+
+
 async def get_audiobook_chapter(
     topic: str,
     chapter_id: str
@@ -719,11 +1084,13 @@ async def get_audiobook_chapter(
                 mime="audio/mpeg"
             )
         # If it's a local path
-        elif os.path.exists(url):
-            with open(url, "rb") as f:
-                audio_bytes = f.read()
+        # Hand Chainlit the path so it streams the file itself, instead of us
+        # holding a tens-of-MB chapter in memory. Opening the file doubles as the
+        # existence check and starts readahead for Chainlit's read.
+        elif _warm_file_cache(url):
+            _prefetch_next_chapter(topic, chapter_id)
             return cl.Audio(
-                content=audio_bytes,
+                path=url,
                 name=f"{chapter.get('title', 'audiobook')}.mp3",
                 mime="audio/mpeg"
             )
@@ -749,38 +1116,39 @@ def find_relevant_chapters(
     Returns:
         List of chapter dicts with title, topic, chapter_id, and match_score
     """
-    text_lower = text.lower()
-    results = []
+    if not _KEYWORD_INDEX:  # No chapters configured
+        return []
 
-    # Determine relevant topics based on bot
-    relevant_topics = BOT_TOPIC_MAP.get(bot_id, list(AUDIOBOOK_CHAPTERS.keys()))
+    match_counts = Counter()
+    for kw in _matched_keywords(text):
+        match_counts.update(_KEYWORD_INDEX[kw])
 
-    for topic in relevant_topics:
-        if topic not in AUDIOBOOK_CHAPTERS:
-            continue
-
-        for chapter_id, chapter in AUDIOBOOK_CHAPTERS[topic].items():
-            url = chapter.get("url", "")
-            if not url:  # Skip unconfigured chapters
-                continue
+    if not match_counts:
+        return []
 
-            # Calculate relevance score based on keyword matches
-            keywords = chapter.get("keywords", [])
-            match_count = sum(1 for kw in keywords if kw in text_lower)
+    # Determine relevant topics based on bot (earlier topics win ties)
+    relevant_topics = BOT_TOPIC_MAP.get(bot_id, list(AUDIOBOOK_CHAPTERS.keys()))
+    topic_rank = {topic: rank for rank, topic in enumerate(relevant_topics)}
 
-            if match_count > 0:
-                results.append({
-                    "topic": topic,
-                    "chapter_id": chapter_id,
-                    "title": chapter.get("title", "Unknown"),
-                    "duration": chapter.get("duration", ""),
-                    "match_score": match_count,
-                    "url": url,
-                })
+    matches = [
+        (position, count) for position, count in match_counts.items()
+        if _CHAPTERS[position].topic in topic_rank
+    ]
 
     # Sort by match score and return top results
-    results.sort(key=lambda x: x["match_score"], reverse=True)
-    return results[:max_results]
+    matches.sort(key=lambda m: (-m[1], topic_rank[_CHAPTERS[m[0]].topic], m[0]))
+    results = []
+    for position, count in matches[:max_results]:
+        chapter = _CHAPTERS[position]
+        results.append({
+            "topic": chapter.topic,
+            "chapter_id": chapter.chapter_id,
+            "title": chapter.title,
+            "duration": chapter.duration,
+            "match_score": count,
+            "url": chapter.url,
+        })
+    return results
 
 
 def get_chapters_for_bot(bot_id: str) -> list[Dict]:
@@ -793,23 +1161,17 @@ def get_chapters_for_bot(bot_id: str) -> list[Dict]:
     Returns:
         List of chapter info dicts
     """
-    relevant_topics = BOT_TOPIC_MAP.get(bot_id, [])
-    chapters = []
-
-    for topic in relevant_topics:
-        if topic not in AUDIOBOOK_CHAPTERS:
-            continue
-
-        for chapter_id, chapter in AUDIOBOOK_CHAPTERS[topic].items():
-            if chapter.get("url"):  # Only include configured chapters
-                chapters.append({
-                    "topic": topic,
-                    "chapter_id": chapter_id,
-                    "title": chapter.get("title", "Unknown"),
-                    "duration": chapter.get("duration", ""),
-                })
-
-    return chapters
+    return [
+        {
+            "topic": chapter.topic,
+            "chapter_id": chapter.chapter_id,
+            "title": chapter.title,
+            "duration": chapter.duration,
+        }
+        for topic in BOT_TOPIC_MAP.get(bot_id, [])
+        for chapter in _CHAPTERS
+        if chapter.topic == topic
+    ]
 
 
 def set_audiobook_chapter(topic: str, chapter_id: str, url: str, **kwargs):
@@ -834,6 +1196,13 @@ def set_audiobook_chapter(topic: str, chapter_id: str, url: str, **kwargs):
     for key, value in kwargs.items():
         AUDIOBOOK_CHAPTERS[topic][chapter_id][key] = value
 
+    global _CHAPTERS, _KEYWORD_INDEX, _KEYWORD_MATCHER, _KEYWORD_REGEX
+    _CHAPTERS = _build_chapters()
+    _KEYWORD_INDEX = _build_keyword_index(_CHAPTERS)
+    _KEYWORD_MATCHER = _build_keyword_matcher(_KEYWORD_INDEX)
+    _KEYWORD_REGEX = None if _KEYWORD_MATCHER else _build_keyword_regex(_KEYWORD_INDEX)
+    _matched_keywords.cache_clear()
+
 
 def list_configured_audiobook_chapters() -> Dict[str, list]:
     """
@@ -843,16 +1212,10 @@ def list_configured_audiobook_chapters() -> Dict[str, list]:
         Dict of topic -> list of configured chapter IDs
     """
     result = {}
-    for topic, chapters in AUDIOBOOK_CHAPTERS.items():
-        configured = [
-            {
-                "chapter_id": ch_id,
-                "title": ch.get("title", "Unknown"),
-                "duration": ch.get("duration", ""),
-            }
-            for ch_id, ch in chapters.items()
-            if ch.get("url")
-        ]
-        if configured:
-            result[topic] = configured
+    for chapter in _CHAPTERS:
+        result.setdefault(chapter.topic, []).append({
+            "chapter_id": chapter.chapter_id,
+            "title": chapter.title,
+            "duration": chapter.duration,
+        })
     return result
@@ -10,10 +10,25 @@ Implements PWS methodology for structured research:
 Based on Barbara Minto's Pyramid Principle and PWS validation methodology.
 """
 
+import json
+import time
+from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any
-from datetime import datetime
+from typing import List, Dict, Iterator, Optional, Any
+from datetime import datetime, timezone
 from enum import Enum
+from itertools import chain
+from operator import attrgetter
+
+# orjson (C-accelerated) for LLM JSON blocks, falling back to stdlib json
+try:
+    import orjson
+    _loads = orjson.loads
+    _JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    # One shared decoder; payloads are always str, so skip json.loads' type dispatch
+    _loads = json.JSONDecoder().decode
+    _JSONDecodeError = json.JSONDecodeError
 
 
 class ThoughtType(Enum):
@@ -22,7 +37,36 @@ class ThoughtType(Enum):
     BRANCH = "branch"          # 🌿 Alternative path
 
 
-@dataclass
+def _utc_from_ns(timestamp_ns: int) -> datetime:
+    """Convert a time.time_ns() stamp to an aware UTC datetime (only done when displayed/serialized)."""
+    return datetime.fromtimestamp(timestamp_ns / 1e9, tz=timezone.utc)
+
+
+_THOUGHT_PREFIXES = {
+    ThoughtType.STANDARD: "💭",
+    ThoughtType.REVISION: "🔄",
+    ThoughtType.BRANCH: "🌿",
+}
+
+
+# (field, type, label) for each question / research-plan query category, in output order
+_QUESTION_CATEGORIES = (
+    ("why_questions", "why", "🔴 WHY"),
+    ("what_if_questions", "what_if", "🟡 WHAT IF"),
+    ("how_questions", "how", "🟢 HOW"),
+)
+_PLAN_QUERY_CATEGORIES = (
+    ("validation_queries", "validation", "📊 Validation"),
+    ("supporting_queries", "supporting", "✅ Supporting"),
+    ("challenging_queries", "challenging", "⚠️ Challenging"),
+    ("context_queries", "context", "📚 Context"),
+)
+
+# ResearchMatrix query lists, in output order
+_MATRIX_QUERY_FIELDS = ("why_queries", "what_if_queries", "how_queries", "validation_queries", "challenge_queries")
+
+
+@dataclass(slots=True)
 class BeautifulQuestions:
     """
     Warren Berger's "A More Beautiful Question" Framework.
@@ -35,24 +79,21 @@ class BeautifulQuestions:
     why_questions: List[str]       # Why does this exist? Why is it a problem?
     what_if_questions: List[str]   # What if we...? What would happen if...?
     how_questions: List[str]       # How might we...? How could we test...?
+    _all_questions: Optional[List[Dict[str, str]]] = field(default=None, init=False, repr=False, compare=False)
 
     def to_prompt(self) -> str:
         """Format for LLM consumption."""
-        lines = ["## Beautiful Questions (Berger Framework)\n"]
+        why = "".join(f"\n- {q}" for q in self.why_questions)
+        what_if = "".join(f"\n- {q}" for q in self.what_if_questions)
+        how = "".join(f"\n- {q}" for q in self.how_questions)
 
-        lines.append("### 🔴 WHY Questions (Challenge assumptions)")
-        for q in self.why_questions:
-            lines.append(f"- {q}")
+        return f"""## Beautiful Questions (Berger Framework)
 
-        lines.append("\n### 🟡 WHAT IF Questions (Explore possibilities)")
-        for q in self.what_if_questions:
-            lines.append(f"- {q}")
+### 🔴 WHY Questions (Challenge assumptions){why}
 
-        lines.append("\n### 🟢 HOW Questions (Actionable inquiry)")
-        for q in self.how_questions:
-            lines.append(f"- {q}")
+### 🟡 WHAT IF Questions (Explore possibilities){what_if}
 
-        return "\n".join(lines)
+### 🟢 HOW Questions (Actionable inquiry){how}"""
 
     def to_dict(self) -> Dict:
         return {
@@ -61,19 +102,23 @@ class BeautifulQuestions:
             "how": self.how_questions
         }
 
+    def iter_all_questions(self) -> Iterator[Dict[str, str]]:
+        """Yield all questions with their types for research targeting."""
+        for attr, q_type, label in _QUESTION_CATEGORIES:
+            for q in getattr(self, attr):
+                yield {"question": q, "type": q_type, "label": label}
+
     def get_all_questions(self) -> List[Dict[str, str]]:
-        """Return all questions with their types for research targeting."""
-        questions = []
-        for q in self.why_questions:
-            questions.append({"question": q, "type": "why", "label": "🔴 WHY"})
-        for q in self.what_if_questions:
-            questions.append({"question": q, "type": "what_if", "label": "🟡 WHAT IF"})
-        for q in self.how_questions:
-            questions.append({"question": q, "type": "how", "label": "🟢 HOW"})
-        return questions
-
-
-@dataclass
+        """
+        Return all questions with their types for research targeting.
+        Built once and reused (questions are fixed after parsing); treat the list as read-only.
+        """
+        if self._all_questions is None:
+            self._all_questions = list(self.iter_all_questions())
+        return self._all_questions
+
+
+@dataclass(slots=True)
 class SCQAAnalysis:
     """Minto SCQA Framework for structuring the research need."""
     situation: str           # Current state - what reader knows
@@ -109,7 +154,7 @@ class SCQAAnalysis:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Thought:
     """A single thought in the sequential thinking process."""
     number: int
@@ -118,16 +163,17 @@ class Thought:
     revises_thought: Optional[int] = None  # For revisions
     branch_id: Optional[str] = None        # For branches
     branch_from: Optional[int] = None      # Which thought this branches from
-    timestamp: datetime = field(default_factory=datetime.utcnow)
+    timestamp_ns: int = field(default_factory=time.time_ns)
+
+    @property
+    def timestamp(self) -> datetime:
+        """Creation time as a UTC datetime."""
+        return _utc_from_ns(self.timestamp_ns)
 
     @property
     def prefix(self) -> str:
         """Visual prefix for the thought type."""
-        if self.thought_type == ThoughtType.REVISION:
-            return "🔄"
-        elif self.thought_type == ThoughtType.BRANCH:
-            return "🌿"
-        return "💭"
+        return _THOUGHT_PREFIXES.get(self.thought_type, "💭")
 
     def to_dict(self) -> Dict:
         return {
@@ -141,7 +187,7 @@ class Thought:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ResearchQuery:
     """A single research query with context."""
     query: str
@@ -150,6 +196,18 @@ class ResearchQuery:
     consolidation_group: str  # For grouping results later
     priority: int = 1      # 1=high, 2=medium, 3=low
 
+    @classmethod
+    def from_llm(cls, data: Dict, category: str) -> "ResearchQuery":
+        """Build a query from one LLM-emitted dict, filling defaults for missing keys."""
+        get = data.get
+        return cls(
+            get("query", ""),
+            category,
+            get("source_question", ""),
+            get("consolidation_group", "general"),
+            get("priority", 1)
+        )
+
     def to_dict(self) -> Dict:
         return {
             "query": self.query,
@@ -160,7 +218,7 @@ class ResearchQuery:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ResearchMatrix:
     """
     Pre-consolidation research planning matrix.
@@ -178,40 +236,52 @@ class ResearchMatrix:
 
     def get_all_queries(self) -> List[ResearchQuery]:
         """Return all queries in priority order."""
-        all_queries = (
-            self.why_queries +
-            self.what_if_queries +
-            self.how_queries +
-            self.validation_queries +
-            self.challenge_queries
+        return sorted(
+            chain(
+                self.why_queries,
+                self.what_if_queries,
+                self.how_queries,
+                self.validation_queries,
+                self.challenge_queries
+            ),
+            key=attrgetter("priority")
         )
-        return sorted(all_queries, key=lambda q: q.priority)
 
     def get_queries_by_group(self) -> Dict[str, List[ResearchQuery]]:
         """Group queries by consolidation group."""
-        groups = {}
-        for q in self.get_all_queries():
-            if q.consolidation_group not in groups:
-                groups[q.consolidation_group] = []
-            groups[q.consolidation_group].append(q)
+        groups: Dict[str, List[ResearchQuery]] = {}
+        for q in chain(
+            self.why_queries,
+            self.what_if_queries,
+            self.how_queries,
+            self.validation_queries,
+            self.challenge_queries
+        ):
+            groups.setdefault(q.consolidation_group, []).append(q)
+        # Buckets keep priority order; sorting each is cheaper than sorting everything
+        for bucket in groups.values():
+            bucket.sort(key=attrgetter("priority"))
         return groups
 
     def total_queries(self) -> int:
-        return len(self.get_all_queries())
+        return (
+            len(self.why_queries) + len(self.what_if_queries) + len(self.how_queries) +
+            len(self.validation_queries) + len(self.challenge_queries)
+        )
 
     def to_dict(self) -> Dict:
-        return {
-            "why_queries": [q.to_dict() for q in self.why_queries],
-            "what_if_queries": [q.to_dict() for q in self.what_if_queries],
-            "how_queries": [q.to_dict() for q in self.how_queries],
-            "validation_queries": [q.to_dict() for q in self.validation_queries],
-            "challenge_queries": [q.to_dict() for q in self.challenge_queries],
-            "consolidation_groups": self.consolidation_groups,
-            "total_queries": self.total_queries()
-        }
-
-
-@dataclass
+        out = {}
+        total = 0
+        for attr in _MATRIX_QUERY_FIELDS:
+            queries = getattr(self, attr)
+            out[attr] = [q.to_dict() for q in queries]
+            total += len(queries)
+        out["consolidation_groups"] = self.consolidation_groups
+        out["total_queries"] = total
+        return out
+
+
+@dataclass(slots=True)
 class ConsolidatedResults:
     """Results organized by consolidation group for synthesis."""
     group_name: str
@@ -233,7 +303,7 @@ class ConsolidatedResults:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ResearchPlan:
     """Structured research plan derived from sequential thinking."""
     known_knowns: List[str]           # What we already know
@@ -243,19 +313,22 @@ class ResearchPlan:
     supporting_queries: List[str]     # Evidence FOR hypothesis
     challenging_queries: List[str]    # Evidence AGAINST (Red Team)
     context_queries: List[str]        # Background/market context
+    _all_queries: Optional[List[Dict[str, str]]] = field(default=None, init=False, repr=False, compare=False)
+
+    def iter_all_queries(self) -> Iterator[Dict[str, str]]:
+        """Yield all queries with their types."""
+        for attr, q_type, label in _PLAN_QUERY_CATEGORIES:
+            for q in getattr(self, attr):
+                yield {"query": q, "type": q_type, "label": label}
 
     def get_all_queries(self) -> List[Dict[str, str]]:
-        """Return all queries with their types."""
-        queries = []
-        for q in self.validation_queries:
-            queries.append({"query": q, "type": "validation", "label": "📊 Validation"})
-        for q in self.supporting_queries:
-            queries.append({"query": q, "type": "supporting", "label": "✅ Supporting"})
-        for q in self.challenging_queries:
-            queries.append({"query": q, "type": "challenging", "label": "⚠️ Challenging"})
-        for q in self.context_queries:
-            queries.append({"query": q, "type": "context", "label": "📚 Context"})
-        return queries
+        """
+        Return all queries with their types.
+        Built once and reused (queries are fixed after parsing); treat the list as read-only.
+        """
+        if self._all_queries is None:
+            self._all_queries = list(self.iter_all_queries())
+        return self._all_queries
 
     def to_dict(self) -> Dict:
         return {
@@ -271,19 +344,34 @@ class ResearchPlan:
         }
 
 
-@dataclass
+def _thought_markdown(thought: Thought) -> str:
+    """Markdown section for one thought (heading, content, trailing blank line)."""
+    type_note = ""
+    if thought.thought_type == ThoughtType.REVISION:
+        type_note = f" *(revises thought {thought.revises_thought})*"
+    elif thought.thought_type == ThoughtType.BRANCH:
+        type_note = f" *(branch {thought.branch_id} from thought {thought.branch_from})*"
+    return f"### {thought.prefix} Thought {thought.number}{type_note}\n{thought.content}\n"
+
+
+@dataclass(slots=True)
 class SequentialThinkingSession:
     """Manages the sequential thinking process for research planning."""
     session_id: str
     scqa: Optional[SCQAAnalysis] = None
     beautiful_questions: Optional[BeautifulQuestions] = None  # Why/What If/How
     thoughts: List[Thought] = field(default_factory=list)
-    branches: Dict[str, List[Thought]] = field(default_factory=dict)
+    branches: Dict[str, List[Thought]] = field(default_factory=lambda: defaultdict(list))
     research_matrix: Optional[ResearchMatrix] = None  # Pre-consolidation planning
     research_plan: Optional[ResearchPlan] = None  # Legacy support
     consolidated_results: Dict[str, ConsolidatedResults] = field(default_factory=dict)
     total_thoughts_estimated: int = 5
-    created_at: datetime = field(default_factory=datetime.utcnow)
+    created_at_ns: int = field(default_factory=time.time_ns)
+
+    @property
+    def created_at(self) -> datetime:
+        """Creation time as a UTC datetime."""
+        return _utc_from_ns(self.created_at_ns)
 
     def add_thought(self, content: str) -> Thought:
         """Add a standard thought."""
@@ -317,8 +405,6 @@ class SequentialThinkingSession:
         )
         self.thoughts.append(thought)
 
-        if branch_id not in self.branches:
-            self.branches[branch_id] = []
         self.branches[branch_id].append(thought)
 
         return thought
@@ -346,32 +432,19 @@ class SequentialThinkingSession:
         lines.append("## Thinking Process")
         lines.append("")
 
-        for thought in self.thoughts:
-            prefix = thought.prefix
-            type_note = ""
-            if thought.thought_type == ThoughtType.REVISION:
-                type_note = f" *(revises thought {thought.revises_thought})*"
-            elif thought.thought_type == ThoughtType.BRANCH:
-                type_note = f" *(branch {thought.branch_id} from thought {thought.branch_from})*"
-
-            lines.append(f"### {prefix} Thought {thought.number}{type_note}")
-            lines.append(thought.content)
-            lines.append("")
+        lines.extend(map(_thought_markdown, self.thoughts))
 
         if self.research_plan:
             lines.append("## Research Plan")
             lines.append("")
             lines.append("### Known Knowns")
-            for item in self.research_plan.known_knowns:
-                lines.append(f"- {item}")
+            lines.extend(f"- {item}" for item in self.research_plan.known_knowns)
             lines.append("")
             lines.append("### Known Unknowns (Research Targets)")
-            for item in self.research_plan.known_unknowns:
-                lines.append(f"- {item}")
+            lines.extend(f"- {item}" for item in self.research_plan.known_unknowns)
             lines.append("")
             lines.append("### Assumptions to Validate")
-            for item in self.research_plan.assumptions:
-                lines.append(f"- {item}")
+            lines.extend(f"- {item}" for item in self.research_plan.assumptions)
 
         return "\n".join(lines)
 
@@ -689,6 +762,29 @@ Build the final pyramid:
 
 # === Helper Functions ===
 
+def _extract_json_fence(text: str) -> Optional[str]:
+    """Contents of the first ```json fenced block, stripped (None if there is no closed block)."""
+    start = text.find("```json")
+    if start < 0:
+        return None
+    start += 7  # len("```json")
+    end = text.find("```", start)
+    if end < 0:
+        return None
+    return text[start:end].strip()
+
+
+def _extract_json(response_text: str) -> Optional[Any]:
+    """Parse the ```json block of an LLM response (None if missing or invalid)."""
+    payload = _extract_json_fence(response_text)
+    if payload is None:
+        return None
+    try:
+        return _loads(payload)
+    except _JSONDecodeError:
+        return None
+
+
 def format_thoughts_for_prompt(thoughts: List[Thought]) -> str:
     """Format thoughts list for LLM prompt."""
     lines = []
@@ -705,129 +801,86 @@ def format_thoughts_for_prompt(thoughts: List[Thought]) -> str:
 
 def parse_beautiful_questions_response(response_text: str) -> Optional[BeautifulQuestions]:
     """Parse LLM response into BeautifulQuestions."""
-    import json
-    import re
-
-    json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-    if json_match:
-        try:
-            data = json.loads(json_match.group(1))
-            return BeautifulQuestions(
-                why_questions=data.get("why_questions", []),
-                what_if_questions=data.get("what_if_questions", []),
-                how_questions=data.get("how_questions", [])
-            )
-        except json.JSONDecodeError:
-            pass
-    return None
+    data = _extract_json(response_text)
+    if data is None:
+        return None
+    return BeautifulQuestions(
+        why_questions=data.get("why_questions", []),
+        what_if_questions=data.get("what_if_questions", []),
+        how_questions=data.get("how_questions", [])
+    )
 
 
 def parse_scqa_response(response_text: str) -> Optional[SCQAAnalysis]:
     """Parse LLM response into SCQAAnalysis."""
-    import json
-    import re
-
-    # Extract JSON from response
-    json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-    if json_match:
-        try:
-            data = json.loads(json_match.group(1))
-            return SCQAAnalysis(
-                situation=data.get("situation", ""),
-                complication=data.get("complication", ""),
-                question=data.get("question", ""),
-                answer_hypothesis=data.get("answer_hypothesis", ""),
-                confidence=data.get("confidence", 0.5)
-            )
-        except json.JSONDecodeError:
-            pass
-    return None
+    data = _extract_json(response_text)
+    if data is None:
+        return None
+    return SCQAAnalysis(
+        situation=data.get("situation", ""),
+        complication=data.get("complication", ""),
+        question=data.get("question", ""),
+        answer_hypothesis=data.get("answer_hypothesis", ""),
+        confidence=data.get("confidence", 0.5)
+    )
 
 
 def parse_thoughts_response(response_text: str, session: SequentialThinkingSession) -> List[Thought]:
     """Parse LLM response into Thought objects."""
-    import json
-    import re
-
     thoughts = []
-    json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-    if json_match:
-        try:
-            data = json.loads(json_match.group(1))
-
-            for t_data in data.get("thoughts", []):
-                t_type = ThoughtType(t_data.get("type", "standard"))
-
-                if t_type == ThoughtType.STANDARD:
-                    thought = session.add_thought(t_data.get("content", ""))
-                elif t_type == ThoughtType.REVISION:
-                    thought = session.add_revision(
-                        t_data.get("content", ""),
-                        t_data.get("revises", 1)
-                    )
-                elif t_type == ThoughtType.BRANCH:
-                    thought = session.add_branch(
-                        t_data.get("content", ""),
-                        t_data.get("branch_id", "alternative"),
-                        t_data.get("branch_from", 1)
-                    )
-                thoughts.append(thought)
-
-            # Adjust estimate if needed
-            if data.get("needs_more_thoughts"):
-                session.adjust_estimate(data.get("adjusted_estimate", session.total_thoughts_estimated + 2))
+    data = _extract_json(response_text)
+    if data is None:
+        return thoughts
+
+    for t_data in data.get("thoughts", []):
+        t_type = ThoughtType(t_data.get("type", "standard"))
+
+        if t_type == ThoughtType.STANDARD:
+            thought = session.add_thought(t_data.get("content", ""))
+        elif t_type == ThoughtType.REVISION:
+            thought = session.add_revision(
+                t_data.get("content", ""),
+                t_data.get("revises", 1)
+            )
+        elif t_type == ThoughtType.BRANCH:
+            thought = session.add_branch(
+                t_data.get("content", ""),
+                t_data.get("branch_id", "alternative"),
+                t_data.get("branch_from", 1)
+            )
+        thoughts.append(thought)
 
-        except json.JSONDecodeError:
-            pass
+    # Adjust estimate if needed
+    if data.get("needs_more_thoughts"):
+        session.adjust_estimate(data.get("adjusted_estimate", session.total_thoughts_estimated + 2))
 
     return thoughts
 
 
 def parse_research_plan_response(response_text: str) -> Optional[ResearchPlan]:
     """Parse LLM response into ResearchPlan."""
-    import json
-    import re
-
-    json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-    if json_match:
-        try:
-            data = json.loads(json_match.group(1))
-            return ResearchPlan(
-                known_knowns=data.get("known_knowns", []),
-                known_unknowns=data.get("known_unknowns", []),
-                assumptions=data.get("assumptions", []),
-                validation_queries=data.get("validation_queries", []),
-                supporting_queries=data.get("supporting_queries", []),
-                challenging_queries=data.get("challenging_queries", []),
-                context_queries=data.get("context_queries", [])
-            )
-        except json.JSONDecodeError:
-            pass
-    return None
+    data = _extract_json(response_text)
+    if data is None:
+        return None
+    return ResearchPlan(
+        known_knowns=data.get("known_knowns", []),
+        known_unknowns=data.get("known_unknowns", []),
+        assumptions=data.get("assumptions", []),
+        validation_queries=data.get("validation_queries", []),
+        supporting_queries=data.get("supporting_queries", []),
+        challenging_queries=data.get("challenging_queries", []),
+        context_queries=data.get("context_queries", [])
+    )
 
 
 def parse_research_matrix_response(response_text: str) -> Optional[ResearchMatrix]:
     """Parse LLM response into ResearchMatrix with consolidation groups."""
-    import json
-    import re
-
-    json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-    if json_match:
+    data = _extract_json(response_text)
+    if data is not None:
         try:
-            data = json.loads(json_match.group(1))
-
             def parse_queries(query_list: List[Dict], category: str) -> List[ResearchQuery]:
                 """Parse a list of query dicts into ResearchQuery objects."""
-                parsed = []
-                for q in query_list:
-                    parsed.append(ResearchQuery(
-                        query=q.get("query", ""),
-                        category=category,
-                        source_question=q.get("source_question", ""),
-                        consolidation_group=q.get("consolidation_group", "general"),
-                        priority=q.get("priority", 1)
-                    ))
-                return parsed
+                return [ResearchQuery.from_llm(q, category) for q in query_list]
 
             return ResearchMatrix(
                 why_queries=parse_queries(data.get("why_queries", []), "why"),
@@ -837,7 +890,7 @@ def parse_research_matrix_response(response_text: str) -> Optional[ResearchMatri
                 challenge_queries=parse_queries(data.get("challenge_queries", []), "challenge"),
                 consolidation_groups=data.get("consolidation_groups", {})
             )
-        except (json.JSONDecodeError, TypeError) as e:
+        except (AttributeError, TypeError) as e:
             print(f"Error parsing research matrix: {e}")
             pass
     return None